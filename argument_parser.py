@@ -14,4 +14,52 @@ class OptionsSolverArgumentParser(object):
             '--type', '-t', choices=['europian', 'asian'],
             required=True, help="Option type"
         )
+        parser.add_argument(
+            '--resume', action='store_true',
+            help="Continue asian option calculation from checkpoint"
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help="Estimate memory, runtime and stability without calculation"
+        )
+        parser.add_argument(
+            '--force', action='store_true',
+            help="Run calculation even if it exceeds budgets from config"
+        )
+        return parser
+
+    @staticmethod
+    def get_convergence_parser(schemes):
+        parser = argparse.ArgumentParser(
+            description="Convergence study of europian option schemes"
+        )
+        parser.add_argument(
+            '--schemes', '-s', nargs='+', choices=schemes, default=schemes,
+            help="Schemes to compare"
+        )
+        parser.add_argument(
+            '--levels', '-l', type=int, default=4,
+            help="Number of refinement levels"
+        )
+        parser.add_argument(
+            '--asset-price-steps', type=int, default=50,
+            help="Number of asset price steps on the coarsest level"
+        )
+        parser.add_argument(
+            '--time-steps', type=int, default=50,
+            help="Number of time steps on the coarsest level"
+        )
+        parser.add_argument(
+            '--processes', '-p', type=int, default=None,
+            help="Number of worker processes (number of CPUs by default)"
+        )
+        parser.add_argument(
+            '--tolerance', type=float, default=None,
+            help="Report the cheapest run with max error below tolerance"
+        )
+        parser.add_argument(
+            '--plot', default=None,
+            help="Path of saved plot (convergence.png in results_path "
+                 "by default)"
+        )
         return parser
@@ -8,8 +8,19 @@ python calculate.py -t europian
 Example command for calculating asian option:
 python calculate.py -t asian
 
+Example command for continuing asian option calculation from checkpoint:
+python calculate.py -t asian --resume
+
+Example command for estimating memory, runtime and stability of
+calculation without running it:
+python calculate.py -t asian --dry-run
+
+Domain maximums and nodes counts may be set to auto in config. Then they
+are chosen by GridPlanner to meet the tolerance set in config.
+
 """
 import os
+import sys
 import time
 import ConfigParser
 
@@ -19,14 +30,101 @@ from market import (
     AsianOption
 )
 from fdms.core import Nodes
+from fdms.planner import GridPlanner
+from fdms.preflight import PreflightEstimator
 from fdms.explicit_fdms import (
     EuropianOptionExplicitFDM,
     AsianOptionExplicitFDM
 )
-from fdms.implicit_fdms import EuropianOptionImplicitFDM
+from fdms.implicit_fdms import (
+    EuropianOptionImplicitFDM,
+    AsianOptionImplicitFDM,
+    AsianOptionReducedFDM
+)
+from fdms.spectral_fdms import EuropianOptionSpectralFDM
 from argument_parser import OptionsSolverArgumentParser
 
 
+def get_grid_setting(config, section, name, convert):
+    """ Value of grid setting from config or None if it is set to auto """
+    value = config.get(section, name).strip()
+    if value == 'auto':
+        return None
+    return convert(value)
+
+
+def get_nodes(config, section, fdm_class, option, market_data, nodes_data,
+              solver_parameters=None):
+    """
+    Nodes for nodes_data list of (interval, nodes_count, name), where
+    interval maximum and nodes count are None for auto settings
+    """
+    auto_names = [
+        name for interval, nodes_count, name in nodes_data
+        if interval[1] is None or nodes_count is None
+    ]
+    if not auto_names:
+        return Nodes(nodes_data)
+
+    intervals = dict(
+        (name, interval) for interval, _, name in nodes_data
+    )
+    planner = GridPlanner(
+        fdm_class, option, market_data,
+        config.getfloat(section, 'tolerance'),
+        asset_price_min=intervals['asset_price'][0],
+        asset_price_max=intervals['asset_price'][1],
+        average_price_min=intervals.get('average_price', [0.0])[0],
+        average_price_max=intervals.get('average_price', [0.0, None])[1],
+        nodes_counts=dict(
+            (name, nodes_count) for _, nodes_count, name in nodes_data
+            if nodes_count is not None
+        ),
+        solver_parameters=solver_parameters
+    )
+    nodes = planner.plan()
+    print("Planned grid for %s: %s" % (section, planner.planned_counts))
+    print("Estimated error: %f" % planner.estimated_error)
+    return nodes
+
+
+def get_budgets(config):
+    """ Memory (in bytes) and runtime budgets from config """
+    budgets = {}
+    for option, name, scale in [
+        ('memory_budget_mb', 'memory_budget', 1024**2),
+        ('runtime_budget_seconds', 'runtime_budget', 1)
+    ]:
+        if config.has_option('other', option) and config.get('other', option):
+            budgets[name] = config.getfloat('other', option) * scale
+    return budgets
+
+
+def run_preflight(config, parser, args, fdm, export_points_number=None):
+    """
+    Print preflight report and exit for dry run. Otherwise refuse to run
+    calculation exceeding budgets unless it is forced
+    """
+    budgets = get_budgets(config)
+    if not args.dry_run and (args.force or not budgets):
+        return
+
+    estimator = PreflightEstimator(
+        fdm, export_points_number=export_points_number
+    )
+    if args.dry_run:
+        estimator.print_report(budgets.get('memory_budget'))
+    messages = estimator.check_budgets(**budgets)
+    if args.dry_run:
+        for message in messages:
+            print("Warning: %s" % message)
+        sys.exit(0)
+    if messages:
+        parser.error(
+            "%s. Use --force to run anyway" % '. '.join(messages)
+        )
+
+
 if __name__ == "__main__":
     config = ConfigParser.RawConfigParser()
     config.read('config.cfg')
@@ -44,22 +142,28 @@ if __name__ == "__main__":
         method_type = config.get(args.type, 'method_type')
         strike = config.getfloat(args.type, 'strike_price')
         maturity = config.getfloat(args.type, 'maturity')
-        time_steps_number = config.getint(args.type, 'time_steps_number')
-        asset_price_steps_number = config.getint(
-            args.type, 'asset_price_steps_number'
+        time_steps_number = get_grid_setting(
+            config, args.type, 'time_steps_number', int
+        )
+        asset_price_steps_number = get_grid_setting(
+            config, args.type, 'asset_price_steps_number', int
         )
         asset_price_min = config.getfloat(args.type, 'asset_price_min')
-        asset_price_max = config.getfloat(args.type, 'asset_price_max')
+        asset_price_max = get_grid_setting(
+            config, args.type, 'asset_price_max', float
+        )
 
         if method_type == 'explicit':
             fdm_class = EuropianOptionExplicitFDM
         elif method_type == 'implicit':
             fdm_class = EuropianOptionImplicitFDM
+        elif method_type == 'spectral':
+            fdm_class = EuropianOptionSpectralFDM
         start_time = time.time()
         option = EuropianOption(
             strike=strike, maturity=maturity
         )
-        nodes = Nodes([
+        nodes = get_nodes(config, args.type, fdm_class, option, market_data, [
             ([0.0, maturity], time_steps_number, 'time'),
             ([asset_price_min, asset_price_max],
              asset_price_steps_number, 'asset_price')
@@ -68,6 +172,7 @@ if __name__ == "__main__":
         fdm = fdm_class(
             option, market_data, nodes
         )
+        run_preflight(config, parser, args, fdm, export_points_number=100)
 
         prices = fdm.calculate_prices()
         end_time = time.time()
@@ -76,7 +181,7 @@ if __name__ == "__main__":
             os.path.join(
                 results_path,
                 "europian %d %d.data.xlsx" %
-                (time_steps_number, asset_price_steps_number),
+                (nodes.time_nodes_count, nodes.asset_price_nodes_count),
             ),
             points_number=100
         )
@@ -88,43 +193,103 @@ if __name__ == "__main__":
         method_type = config.get(args.type, 'method_type')
         strike = config.getfloat(args.type, 'strike_price')
         maturity = config.getfloat(args.type, 'maturity')
-        time_steps_number = config.getint(args.type, 'time_steps_number')
-        asset_price_steps_number = config.getint(
-            args.type, 'asset_price_steps_number'
+        time_steps_number = get_grid_setting(
+            config, args.type, 'time_steps_number', int
         )
-        average_price_steps_number = config.getint(
-            args.type, 'average_price_steps_number'
+        asset_price_steps_number = get_grid_setting(
+            config, args.type, 'asset_price_steps_number', int
+        )
+        average_price_steps_number = get_grid_setting(
+            config, args.type, 'average_price_steps_number', int
         )
         asset_price_min = config.getfloat(args.type, 'asset_price_min')
-        asset_price_max = config.getfloat(args.type, 'asset_price_max')
+        asset_price_max = get_grid_setting(
+            config, args.type, 'asset_price_max', float
+        )
         average_price_min = config.getfloat(args.type, 'average_price_min')
-        average_price_max = config.getfloat(args.type, 'average_price_max')
+        average_price_max = get_grid_setting(
+            config, args.type, 'average_price_max', float
+        )
 
         start_time = time.time()
         option = AsianOption(
             strike=strike, maturity=maturity
         )
-        nodes = Nodes([
+        nodes_data = [
             ([0.0, maturity], time_steps_number, 'time'),
             ([asset_price_min, asset_price_max],
              asset_price_steps_number, 'asset_price'),
             ([average_price_min, average_price_max],
              average_price_steps_number, 'average_price')
-        ])
+        ]
 
-        fdm = AsianOptionExplicitFDM(
-            option, market_data, nodes
+        calculation_parameters = {}
+        solver_parameters = {}
+        if method_type == 'explicit':
+            fdm_class = AsianOptionExplicitFDM
+            if config.has_option(args.type, 'checkpoint_path'):
+                calculation_parameters = {
+                    'checkpoint_path':
+                        config.get(args.type, 'checkpoint_path') or None,
+                    'checkpoint_steps':
+                        config.getint(args.type, 'checkpoint_steps'),
+                    'checkpoint_seconds':
+                        config.getfloat(args.type, 'checkpoint_seconds'),
+                    'resume': args.resume
+                }
+            if args.resume:
+                if not calculation_parameters.get('checkpoint_path'):
+                    parser.error("checkpoint_path is not set in config")
+                # solver parameters are taken from the checkpoint
+                checkpoint = AsianOptionExplicitFDM.load_checkpoint(
+                    calculation_parameters['checkpoint_path']
+                )
+                market_data = MarketData(
+                    interest=checkpoint['interest'],
+                    volatility=checkpoint['volatility']
+                )
+                option = AsianOption(
+                    strike=checkpoint['strike'],
+                    maturity=checkpoint['maturity']
+                )
+                nodes_data = checkpoint['nodes_data']
+        elif method_type == 'implicit':
+            fdm_class = AsianOptionReducedFDM
+            nodes_data.append((
+                [config.getfloat(args.type, 'reduced_variable_min'),
+                 config.getfloat(args.type, 'reduced_variable_max')],
+                config.getint(args.type, 'reduced_variable_steps_number'),
+                'reduced_variable'
+            ))
+        elif method_type == 'theta':
+            fdm_class = AsianOptionImplicitFDM
+            solver_parameters = {
+                'theta': config.getfloat(args.type, 'theta'),
+                'linear_solver': config.get(args.type, 'linear_solver')
+            }
+            if config.has_option(args.type, 'linear_solver_tolerance'):
+                solver_parameters['tolerance'] = config.getfloat(
+                    args.type, 'linear_solver_tolerance'
+                )
+        nodes = get_nodes(
+            config, args.type, fdm_class, option, market_data, nodes_data,
+            solver_parameters
         )
 
-        prices = fdm.calculate_prices()
+        fdm = fdm_class(
+            option, market_data, nodes, **solver_parameters
+        )
+        run_preflight(config, parser, args, fdm)
+
+        prices = fdm.calculate_prices(**calculation_parameters)
         end_time = time.time()
         fdm.plot_option_prices(asset_price_sparse=35, average_price_sparse=20)
         fdm.export_to_file(
             os.path.join(
                 results_path,
                 "asian_data %d %d %d.xlsx" %
-                (time_steps_number, asset_price_steps_number,
-                 average_price_steps_number)
+                (nodes.time_nodes_count, nodes.asset_price_nodes_count,
+                 nodes.average_price_nodes_count)
             )
         )
         print("Executing time %f" % (end_time - start_time))
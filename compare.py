@@ -1,139 +1,241 @@
 # -*- coding: utf-8 -*-
 """
-Calculate options' prices.
+Convergence study of finite difference schemes for europian option.
 
-Example command for calculating europian option:
-python calculate.py -t europian -mt implicit -s 150.0 -m 1.0 -i 0.05 \
- -v 0.01 -smax 350.0
+Every registered scheme is run over a ladder of refined grids in a pool
+of processes. Max error against analytical price, runtime and memory of
+every run are collected into error-vs-cost table, runs which are not
+dominated by cheaper and more accurate runs (Pareto front) are marked.
+Option and market data are taken from europian section of config.cfg.
 
-Example command for calculating asian option:
-python calculate.py -t asian -tm explicit -s 150.0 -m 1.0 -i 0.05 \
- -v 0.01 -smax 350.0
--amax 200.0
+Example command for comparing all schemes on 5 levels:
+python compare.py -l 5
+
+Example command for choosing the cheapest grid for accuracy 1e-3:
+python compare.py -s explicit implicit --tolerance 0.001
 
 """
+import os
+import math
 import time
+import resource
+import multiprocessing
+import ConfigParser
 
 import numpy as np
 import matplotlib.pyplot as plt
 
 from market import (
     MarketData,
-    EuropianOption,
-    AsianOption
+    EuropianOption
 )
 from fdms.core import Nodes
-from fdms.explicit_fdms import (
-    EuropianOptionExplicitFDM,
-    AsianOptionExplicitFDM
-)
+from fdms.explicit_fdms import EuropianOptionExplicitFDM
 from fdms.implicit_fdms import EuropianOptionImplicitFDM
+from fdms.spectral_fdms import EuropianOptionSpectralFDM
 from argument_parser import OptionsSolverArgumentParser
-from utils import add_beautiful_subplot
-
 
-if __name__ == "__main__":
-    parser = OptionsSolverArgumentParser.get_parser()
-    args = parser.parse_args()
 
-    market_data = MarketData(
-        interest=args.interest, volatility=args.volatility
+# scheme name: (solver class, growth of time steps number per level).
+# Asset price steps number is doubled on every level, so time steps
+# growth 4 keeps balance of errors of first order in time and second
+# order in asset price. Spectral scheme is exact in time and needs only
+# the final layer
+SCHEMES = {
+    'explicit': (EuropianOptionExplicitFDM, 4),
+    'implicit': (EuropianOptionImplicitFDM, 4),
+    'spectral': (EuropianOptionSpectralFDM, 0),
+}
+
+
+def get_peak_memory():
+    """ Peak resident memory of the process in bytes """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux
+    return peak * 1024
+
+
+def run_convergence_task(task):
+    """
+    Run one scheme on one grid. Worker processes are not reused, so the
+    growth of peak memory belongs to this run only
+    """
+    (
+        scheme, level, strike, maturity, interest, volatility,
+        asset_price_interval, asset_price_steps_number, time_steps_number
+    ) = task
+    fdm_class, _ = SCHEMES[scheme]
+    option = EuropianOption(strike=strike, maturity=maturity)
+    market_data = MarketData(interest=interest, volatility=volatility)
+
+    def get_fdm(time_steps_number):
+        return fdm_class(option, market_data, Nodes([
+            ([0.0, maturity], time_steps_number + 1, 'time'),
+            (asset_price_interval, asset_price_steps_number + 1,
+             'asset_price')
+        ]))
+
+    fdm = get_fdm(time_steps_number)
+    max_dt = fdm.get_max_stable_dt()
+    if fdm.dt > max_dt:
+        # explicit scheme is run on the coarsest stable time grid
+        time_steps_number = int(math.ceil(maturity / max_dt))
+        fdm = get_fdm(time_steps_number)
+
+    initial_memory = get_peak_memory()
+    start_time = time.time()
+    prices = fdm.calculate_prices()[-1]
+    runtime = time.time() - start_time
+    memory = get_peak_memory() - initial_memory
+
+    error = np.max(np.abs(
+        option.calculate_price(fdm.nodes.asset_price_nodes, market_data) -
+        prices
+    ))
+    return {
+        'scheme': scheme,
+        'level': level,
+        'time_steps_number': time_steps_number,
+        'asset_price_steps_number': asset_price_steps_number,
+        'error': error,
+        'runtime': runtime,
+        'memory': memory
+    }
+
+
+def get_tasks(args, strike, maturity, interest, volatility,
+              asset_price_interval):
+    tasks = []
+    for scheme in args.schemes:
+        _, time_steps_growth = SCHEMES[scheme]
+        for level in range(args.levels):
+            tasks.append((
+                scheme, level, strike, maturity, interest, volatility,
+                asset_price_interval, args.asset_price_steps * 2**level,
+                args.time_steps * time_steps_growth**level
+                if time_steps_growth else 1
+            ))
+    # the most expensive runs go first for better load balance
+    return sorted(tasks, key=lambda task: -task[1])
+
+
+def mark_pareto_front(results):
+    """
+    Mark runs for which there is no other run with smaller or equal
+    runtime and max error
+    """
+    best_error = np.inf
+    for result in sorted(
+        results, key=lambda result: (result['runtime'], result['error'])
+    ):
+        result['pareto'] = result['error'] < best_error
+        best_error = min(best_error, result['error'])
+
+
+def print_table(results):
+    print(
+        "%-10s %5s %8s %8s %12s %10s %10s %6s" % (
+            'Scheme', 'Level', 'Time', 'Asset', 'Max error', 'Runtime',
+            'Memory MB', 'Pareto'
+        )
     )
+    for result in sorted(results, key=lambda result: result['runtime']):
+        print(
+            "%-10s %5d %8d %8d %12.3e %10.3f %10.1f %6s" % (
+                result['scheme'], result['level'],
+                result['time_steps_number'],
+                result['asset_price_steps_number'], result['error'],
+                result['runtime'], result['memory'] / 1024.0**2,
+                '*' if result['pareto'] else ''
+            )
+        )
 
-    if args.type == 'europian':
-        option = EuropianOption(
-            strike=args.strike, maturity=args.maturity
+
+def save_plot(results, filename):
+    """ Max error with respect to runtime for every scheme """
+    figure = plt.figure()
+    axes = figure.add_subplot(111)
+    for scheme in sorted(set(result['scheme'] for result in results)):
+        scheme_results = sorted(
+            (result for result in results if result['scheme'] == scheme),
+            key=lambda result: result['level']
         )
-        nodes = Nodes([
-            ([0.0, args.maturity], 1190, 'time'),
-            ([args.asset_price_min, args.asset_price_max],
-             3500, 'asset_price')
-        ])
-        prices_analytical = option.calculate_price(
-            nodes.asset_price_nodes, market_data
+        axes.loglog(
+            [result['runtime'] for result in scheme_results],
+            [result['error'] for result in scheme_results],
+            'o-', label=scheme
         )
+    front = sorted(
+        (result for result in results if result['pareto']),
+        key=lambda result: result['runtime']
+    )
+    axes.loglog(
+        [result['runtime'] for result in front],
+        [result['error'] for result in front],
+        'k--', label='Pareto front'
+    )
+    axes.set_xlabel('Runtime, s')
+    axes.set_ylabel('Max error')
+    axes.legend()
+    figure.savefig(filename)
+    plt.close(figure)
 
-        prices_numerical = {}
-        max_errors = {}
-        for fdm_class in [
-            EuropianOptionExplicitFDM, EuropianOptionImplicitFDM
-        ]:
-            start_time = time.time()
 
-            fdm = fdm_class(
-                option, market_data, nodes
-            )
+if __name__ == "__main__":
+    config = ConfigParser.RawConfigParser()
+    config.read('config.cfg')
+    results_path = config.get('other', 'results_path')
 
-            prices_numerical[fdm_class.__name__] = (
-                fdm.calculate_prices()[-1][:]
-            )
-            end_time = time.time()
+    parser = OptionsSolverArgumentParser.get_convergence_parser(
+        sorted(SCHEMES)
+    )
+    args = parser.parse_args()
 
-            print("Executing time for %s %f" % (
-                fdm_class.__name__, (end_time - start_time)
-            ))
-            max_errors[fdm_class.__name__] = np.max(
-                np.abs(
-                    prices_analytical - prices_numerical[fdm_class.__name__]
+    tasks = get_tasks(
+        args,
+        strike=config.getfloat('europian', 'strike_price'),
+        maturity=config.getfloat('europian', 'maturity'),
+        interest=config.getfloat('europian', 'interest_rate'),
+        volatility=config.getfloat('europian', 'volatility'),
+        asset_price_interval=[
+            config.getfloat('europian', 'asset_price_min'),
+            config.getfloat('europian', 'asset_price_max')
+        ]
+    )
+
+    start_time = time.time()
+    pool = multiprocessing.Pool(args.processes, maxtasksperchild=1)
+    try:
+        results = pool.map(run_convergence_task, tasks, chunksize=1)
+    finally:
+        pool.close()
+        pool.join()
+    print("Executing time %f" % (time.time() - start_time))
+
+    mark_pareto_front(results)
+    print_table(results)
+
+    if args.tolerance is not None:
+        accurate_results = [
+            result for result in results if result['error'] <= args.tolerance
+        ]
+        if accurate_results:
+            cheapest = min(
+                accurate_results, key=lambda result: result['runtime']
+            )
+            print(
+                "Cheapest run with max error below %g: %s, %d time steps, "
+                "%d asset price steps" % (
+                    args.tolerance, cheapest['scheme'],
+                    cheapest['time_steps_number'],
+                    cheapest['asset_price_steps_number']
                 )
             )
-            print("Max error for %s: %f" % (
-                fdm_class.__name__, max_errors[fdm_class.__name__]
-            ))
-
-        fig = plt.figure(1)
-
-        explicit_diff = (
-            prices_analytical -
-            prices_numerical[EuropianOptionExplicitFDM.__name__]
-        )
-
-        ymin = np.min(explicit_diff)
-        ymax = np.max(explicit_diff)
-        xlim = [args.asset_price_min - 3, args.asset_price_max]
-        ylim = [ymin - 0.01 * (ymax - ymin), ymax + 0.01 * (ymax - ymin)]
-        add_beautiful_subplot(fig, 211, xlim, ylim)
-        plt.plot(
-            nodes.asset_price_nodes, explicit_diff
-        )
+        else:
+            print("No run has max error below %g" % args.tolerance)
 
-        implicit_diff = (
-            prices_analytical -
-            prices_numerical[EuropianOptionImplicitFDM.__name__]
-        )
-
-        ymin = np.min(implicit_diff)
-        ymax = np.max(implicit_diff)
-        xlim = [args.asset_price_min - 3, args.asset_price_max]
-        ylim = [ymin - 0.01 * (ymax - ymin), ymax + 0.01 * (ymax - ymin)]
-        add_beautiful_subplot(fig, 212, xlim, ylim)
-        plt.plot(
-            nodes.asset_price_nodes, implicit_diff
-        )
-        plt.show()
-
-    elif args.type == 'asian':
-        start_time = time.time()
-        option = AsianOption(
-            strike=args.strike, maturity=args.maturity
-        )
-        nodes = Nodes([
-            ([0.0, args.maturity], 100, 'time'),
-            ([args.asset_price_min, args.asset_price_max],
-             100, 'asset_price'),
-            ([args.average_price_min, args.average_price_max],
-             100, 'average_price')
-        ])
-
-        fdm = AsianOptionExplicitFDM(
-            option, market_data, nodes
-        )
-
-        prices = fdm.calculate_prices()
-        end_time = time.time()
-        print("Executing time %f" % (end_time - start_time))
-        print(prices[-1])
-    else:
-        raise ValueError(
-            "Only europian and asian options are supported at this moment"
-        )
+    plot_filename = args.plot or os.path.join(
+        results_path, 'convergence.png'
+    )
+    save_plot(results, plot_filename)
+    print("Plot saved to %s" % plot_filename)
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+""" Adaptive time stepping for one-step finite difference schemes """
+
+import numpy as np
+
+
+class AdaptiveTimeStepper(object):
+    """
+    Error controlled time stepping for schemes with
+    step(layer, time_node, dt) method and order attribute, for example
+    EuropianOptionImplicitFDM or AmericanOptionImplicitFDM.
+
+    Local truncation error is estimated by step doubling: the layer is
+    calculated with one step dt and with two steps dt / 2, and the step
+    is accepted if the estimate is not greater than tolerance. Accepted
+    layer is Richardson extrapolation of both results, which is one
+    order more accurate than the scheme itself. Step size is changed
+    only when the estimate asks for noticeably different step, so
+    tridiagonal factorizations are reused from the cache. Constraints of
+    the option (e.g. early exercise) are applied to the extrapolated
+    layer.
+
+    Accepted times to maturity are stored as maturities of the solver,
+    they are rows of its option prices.
+    """
+    def __init__(self, fdm, tolerance, initial_dt=None, max_dt=None,
+                 safety=0.9, max_growth=2.0, min_change=1.25):
+        self.fdm = fdm
+        self.tolerance = tolerance
+        self.initial_dt = (
+            initial_dt if initial_dt is not None
+            else fdm.option.maturity * 1e-4
+        )
+        self.max_dt = (
+            max_dt if max_dt is not None else fdm.option.maturity / 10.0
+        )
+        self.safety = safety
+        self.max_growth = max_growth
+        self.min_change = min_change
+
+    def _get_error(self, full_step_layer, half_steps_layer):
+        return (
+            np.max(np.abs(half_steps_layer - full_step_layer)) /
+            (2**self.fdm.order - 1)
+        )
+
+    def calculate_prices(self):
+        maturity = self.fdm.option.maturity
+        layer = self.fdm.option.calculate_payoff(
+            self.fdm.nodes.asset_price_nodes
+        )
+        time_nodes = [0.0]
+        layers = [layer]
+        rejected_steps_number = 0
+        used_steps = set()
+
+        tau = 0.0
+        dt = self.initial_dt
+        while maturity - tau > 1e-12 * maturity:
+            step_dt = min(dt, maturity - tau)
+            used_steps.update([step_dt, step_dt / 2.0])
+
+            full_step_layer = self.fdm.step(layer, tau + step_dt, step_dt)
+            half_steps_layer = self.fdm.step(
+                self.fdm.step(layer, tau + step_dt / 2.0, step_dt / 2.0),
+                tau + step_dt, step_dt / 2.0
+            )
+            error = self._get_error(full_step_layer, half_steps_layer)
+            allowed_error = self.tolerance
+
+            if error > 0:
+                factor = self.safety * (
+                    allowed_error / error
+                )**(1.0 / (self.fdm.order + 1))
+            else:
+                factor = self.max_growth
+
+            if error <= allowed_error:
+                tau += step_dt
+                # local extrapolation raises the order of accepted layer
+                layer = (
+                    half_steps_layer +
+                    (half_steps_layer - full_step_layer) /
+                    (2**self.fdm.order - 1)
+                )
+                self.fdm._apply_constraints(layer)
+                time_nodes.append(tau)
+                layers.append(layer)
+                if factor >= self.min_change:
+                    dt = min(dt * min(factor, self.max_growth), self.max_dt)
+            else:
+                rejected_steps_number += 1
+                dt = step_dt * max(factor, 0.2)
+
+        self.time_nodes = np.array(time_nodes)
+        self.accepted_steps = np.diff(self.time_nodes)
+        self.rejected_steps_number = rejected_steps_number
+        self.factorizations_number = len(used_steps)
+
+        self.fdm.maturities = self.time_nodes
+        self.fdm.option_prices = np.array(layers)
+        if hasattr(self.fdm, 'get_exercise_boundary'):
+            self.fdm.exercise_boundary = self.fdm.get_exercise_boundary(
+                self.fdm.option_prices
+            )
+        return self.fdm.option_prices
+
+    def print_report(self):
+        """ Print information about accepted step sequence """
+        print("Accepted steps: %d" % len(self.accepted_steps))
+        print("Rejected steps: %d" % self.rejected_steps_number)
+        print("Factorizations: %d" % self.factorizations_number)
+        print("Minimum step: %e, maximum step: %e" % (
+            np.min(self.accepted_steps), np.max(self.accepted_steps)
+        ))
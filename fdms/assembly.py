@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+""" Sparse assembly of finite difference operator for asian options """
+
+import numpy as np
+from scipy import sparse
+from scipy.sparse.linalg import (
+    bicgstab,
+    spilu,
+    splu,
+    LinearOperator
+)
+
+
+class AsianOperator(object):
+    """
+    Spatial operator of asian option PDE on the full (S, A) grid as
+    sparse matrices. Layers are flattened in row-major order, so node
+    (j, k) has index j * A_number + k.
+
+    Rows of inner nodes contain the stencil built from get_coeffs_*
+    arrays of the solver divided by dt. Boundary rules are the same as in
+    AsianOptionExplicitFDM: Dirichlet values for S = 0, S = S_max and
+    A = A_max (the last one includes corners) and C_{j,0} = C_{j,1} for
+    A = 0. Matrices are taken from the process-wide cache of the solver.
+    Factorizations are kept by the operator only, since LU fill-in may
+    be much larger than the matrix.
+    """
+    def __init__(self, fdm):
+        self.fdm = fdm
+        self.shape = (fdm._S_number, fdm._A_number)
+        self.size = fdm._S_number * fdm._A_number
+
+        j, k = np.indices(self.shape)
+        self.front = (k == 0).ravel()
+        self.back = (k == self.shape[1] - 1).ravel()
+        self.dirichlet = (
+            self.back |
+            ((j == 0) | (j == self.shape[0] - 1)).ravel() & ~self.front
+        )
+        self.inner = ~(self.front | self.dirichlet)
+        self._factorizations = {}
+
+    def _get_cached(self, name, calculate, *parameters):
+        return self.fdm._get_cached(
+            name, calculate, self.fdm.dt, self.fdm.dS, self.fdm.dA,
+            self.shape, *parameters
+        )
+
+    def get_spatial_operator(self):
+        """ CSR matrix L, dC/dtau = L C in inner nodes, zero elsewhere """
+        return self._get_cached(
+            'asian_operator', self._assemble_spatial_operator
+        )
+
+    def _assemble_spatial_operator(self):
+        fdm = self.fdm
+        dt = fdm.dt
+        S_number, A_number = self.shape
+        coefficients = [
+            ((fdm.get_coeffs_center() - 1.0) / dt, 0),
+            (fdm.get_coeffs_left() / dt, -A_number),
+            (fdm.get_coeffs_right() / dt, A_number),
+            (fdm.get_coeffs_back() / dt, -1),
+            (fdm.get_coeffs_front() / dt, 1)
+        ]
+        rows = np.flatnonzero(self.inner)
+        S_indices = rows // A_number
+        return sparse.csr_matrix(
+            (
+                np.concatenate([
+                    coefficient[S_indices] for coefficient, _ in coefficients
+                ]),
+                (
+                    np.tile(rows, len(coefficients)),
+                    np.concatenate([rows + shift for _, shift in coefficients])
+                )
+            ),
+            shape=(self.size, self.size)
+        )
+
+    def get_boundary_values(self, time_node):
+        """ Dirichlet values at tau = time_node, zero in other nodes """
+        values = np.zeros(self.shape)
+        values[0] = self.fdm.get_boundary_left(time_node)
+        values[-1] = self.fdm.get_boundary_right(time_node)
+        values[:, -1] = self.fdm.get_boundary_back(time_node)
+        values = values.ravel()
+        values[~self.dirichlet] = 0.0
+        return values
+
+    def explicit_step(self, layer, time_node):
+        """ Explicit Euler step to time_node by matrix-vector product """
+        layer = layer.ravel()
+        next_layer = np.where(
+            self.inner,
+            layer + self.fdm.dt * self.get_spatial_operator().dot(layer),
+            self.get_boundary_values(time_node)
+        ).reshape(self.shape)
+        next_layer[:, 0] = self.fdm.get_boundary_front(next_layer[:, 1])
+        return next_layer
+
+    def get_implicit_matrix(self, theta):
+        """
+        CSC matrix of theta scheme: I - theta * dt * L in inner nodes and
+        boundary rules in boundary nodes
+        """
+        return self._get_cached(
+            'asian_operator_implicit',
+            lambda: self._assemble_implicit_matrix(theta),
+            theta
+        )
+
+    def _assemble_implicit_matrix(self, theta):
+        # rows of L in boundary nodes are zero, so they get identity, and
+        # front rows get -C_{j,1} for C_{j,0} - C_{j,1} = 0
+        front_rows = np.flatnonzero(self.front)
+        front = sparse.csr_matrix(
+            (-np.ones(len(front_rows)), (front_rows, front_rows + 1)),
+            shape=(self.size, self.size)
+        )
+        return sparse.csc_matrix(
+            sparse.identity(self.size) -
+            theta * self.fdm.dt * self.get_spatial_operator() + front
+        )
+
+    def _get_factorization(self, factorize, theta):
+        key = (factorize.__name__, theta)
+        if key not in self._factorizations:
+            self._factorizations[key] = factorize(
+                self.get_implicit_matrix(theta)
+            )
+        return self._factorizations[key]
+
+    def get_factorization(self, theta):
+        """ Sparse LU factorization of the theta scheme matrix """
+        return self._get_factorization(splu, theta)
+
+    def get_preconditioner(self, theta):
+        """ Incomplete LU preconditioner for iterative solves """
+        return self._get_factorization(spilu, theta)
+
+    def implicit_step(self, layer, time_node, theta=1.0,
+                      linear_solver='lu', tolerance=1e-10):
+        """
+        Theta scheme step to time_node (theta = 1 is implicit Euler,
+        theta = 0.5 is Crank-Nicolson). Linear system is solved by
+        sparse LU or by BiCGSTAB with ILU preconditioner, which stops at
+        the residual norm tolerance * norm(rhs)
+        """
+        layer = layer.ravel()
+        rhs = np.where(
+            self.inner,
+            layer + (1.0 - theta) * self.fdm.dt *
+            self.get_spatial_operator().dot(layer),
+            self.get_boundary_values(time_node)
+        )
+
+        if linear_solver == 'lu':
+            next_layer = self.get_factorization(theta).solve(rhs)
+        elif linear_solver == 'bicgstab':
+            preconditioner = self.get_preconditioner(theta)
+            parameters = {
+                'x0': layer,
+                'M': LinearOperator(
+                    (self.size, self.size), preconditioner.solve
+                )
+            }
+            try:
+                next_layer, info = bicgstab(
+                    self.get_implicit_matrix(theta), rhs, rtol=tolerance,
+                    **parameters
+                )
+            except TypeError:
+                # SciPy older than 1.12 has tol instead of rtol
+                next_layer, info = bicgstab(
+                    self.get_implicit_matrix(theta), rhs, tol=tolerance,
+                    **parameters
+                )
+            if info:
+                raise RuntimeError(
+                    "BiCGSTAB did not converge at tau = %f" % time_node
+                )
+        else:
+            raise ValueError(
+                "Linear solver must be either lu or bicgstab"
+            )
+        return next_layer.reshape(self.shape)
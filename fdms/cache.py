@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+""" Process-wide cache of coefficients of finite difference schemes """
+
+import collections
+
+import numpy as np
+
+
+CacheInfo = collections.namedtuple(
+    'CacheInfo',
+    ['hits', 'misses', 'maxsize', 'currsize', 'maxbytes', 'currbytes']
+)
+
+
+class CoefficientsCache(object):
+    """
+    Bounded LRU cache for coefficient arrays and tridiagonal
+    factorizations. Solvers with the same market data and grid share
+    the cached values, which are stored as read-only arrays.
+
+    Both the number of entries and the total size of their arrays are
+    bounded, so a few dense matrices don't keep gigabytes alive. Values
+    larger than maxbytes are returned without being stored.
+    """
+    def __init__(self, maxsize=128, maxbytes=256 * 1024**2):
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self.hits = 0
+        self.misses = 0
+        self.currbytes = 0
+        self._values = collections.OrderedDict()
+
+    def get(self, key, calculate):
+        """
+        Return value for the key, calculate() is called only if the key
+        is not in the cache yet
+        """
+        try:
+            value = self._values.pop(key)
+        except KeyError:
+            self.misses += 1
+            value = _make_read_only(calculate())
+            if _get_nbytes(value) > self.maxbytes:
+                return value
+            self.currbytes += _get_nbytes(value)
+        else:
+            self.hits += 1
+
+        self._values[key] = value
+        while (
+            len(self._values) > self.maxsize or
+            self.currbytes > self.maxbytes
+        ):
+            _, evicted = self._values.popitem(last=False)
+            self.currbytes -= _get_nbytes(evicted)
+        return value
+
+    def info(self):
+        return CacheInfo(
+            self.hits, self.misses, self.maxsize, len(self._values),
+            self.maxbytes, self.currbytes
+        )
+
+    def clear(self):
+        self.hits = 0
+        self.misses = 0
+        self.currbytes = 0
+        self._values.clear()
+
+
+def get_cache_key(*parameters):
+    """ Hashable key from scalars and arrays """
+    return tuple(
+        tuple(np.ravel(parameter).tolist())
+        if isinstance(parameter, np.ndarray) else parameter
+        for parameter in parameters
+    )
+
+
+def _get_nbytes(value):
+    """ Size of arrays in value, other objects are not counted """
+    if isinstance(value, tuple):
+        return sum(_get_nbytes(item) for item in value)
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    return 0
+
+
+def _make_read_only(value):
+    if isinstance(value, tuple):
+        return tuple(_make_read_only(item) for item in value)
+    if isinstance(value, np.ndarray):
+        value = value.view()
+        value.flags.writeable = False
+    return value
+
+
+coefficients_cache = CoefficientsCache()
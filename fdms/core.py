@@ -2,11 +2,23 @@
 """ Base classes for finite difference schemes realizations """
 
 import numpy as np
-from openpyxl import Workbook
+from openpyxl import (
+    Workbook,
+    load_workbook
+)
 import matplotlib.pyplot as plt
 from matplotlib import cm
 from mpl_toolkits.mplot3d import Axes3D
 
+from .cache import (
+    coefficients_cache,
+    get_cache_key
+)
+from .interpolation import (
+    EuropianPriceInterpolator,
+    AsianPriceInterpolator
+)
+
 
 class FDMBase(object):
     """
@@ -21,9 +33,64 @@ class FDMBase(object):
     def calculate_prices(self):
         raise NotImplementedError
 
+    def iter_layers(self):
+        """
+        Generator of (tau, layer) for every time layer of the scheme.
+        Layer is a view of the working array of the solver, it is valid
+        until the next iteration, so copy it to keep it
+        """
+        raise NotImplementedError
+
+    def _get_cached(self, name, calculate, *grid_parameters):
+        """
+        Get values from process-wide cache. Key consists of name, market
+        data and grid parameters, calculate() is called on cache miss
+        """
+        return coefficients_cache.get(
+            get_cache_key(
+                name, self.market.interest, self.market.volatility,
+                *grid_parameters
+            ),
+            calculate
+        )
+
     def plot_option_prices(self, sparse_coordinates):
         raise NotImplementedError
 
+    def get_price_interpolator(self):
+        raise NotImplementedError
+
+    def get_max_stable_dt(self):
+        """
+        Maximum time step for which the scheme is stable. Implicit schemes
+        are unconditionally stable
+        """
+        return np.inf
+
+    def _get_batch_shape(self):
+        """
+        Leading axes of layers. Interest and volatility may be arrays of
+        shape (scenarios, 1) to solve all scenarios in one pass
+        """
+        return np.broadcast(
+            self.market.interest, self.market.volatility
+        ).shape[:-1]
+
+    def get_memory_estimate(self):
+        """
+        Estimate of memory used by the solver.
+        :return: dict with bytes of working arrays ('layers') and of
+        stored option prices ('history')
+        """
+        raise NotImplementedError
+
+    def _check_prices_calculated(self):
+        if not hasattr(self, 'option_prices'):
+            raise AttributeError(
+                'Option prices not calculated yet.'
+                ' Run calculate_prices method firstly'
+            )
+
     def export_to_file(self):
         raise NotImplementedError
 
@@ -39,13 +106,77 @@ class FDMBaseEuropian(FDMBase):
         )
         self.dt = self.nodes.time_nodes[1] - self.nodes.time_nodes[0]
 
+    def get_boundary_left(self, time_node):
+        """ Boundary values for S = 0 """
+        return np.zeros_like(time_node, dtype=float)
+
+    def get_boundary_right(self, time_node):
+        """ Boundary values for S = S_max """
+        return (
+            self.nodes.asset_price_nodes[-1] -
+            self.option.strike * np.exp(-self.market.interest * time_node)
+        )
+
+    def _apply_constraints(self, layer):
+        """ Modify calculated layer in place if the option requires it """
+        pass
+
+    def get_memory_estimate(self):
+        nodes_count = len(self.nodes.asset_price_nodes)
+        itemsize = np.dtype(float).itemsize
+        return {
+            # two layers, coefficients and factorization
+            'layers': 6 * nodes_count * itemsize,
+            'history': len(self.nodes.time_nodes) * nodes_count * itemsize
+        }
+
+    def calculate_prices(self):
+        """ Option prices for every time node and asset price node """
+        C = np.empty(
+            (len(self.nodes.time_nodes),) + self._get_batch_shape() +
+            (len(self.nodes.asset_price_nodes),)
+        )
+        for step, (tau, layer) in enumerate(self.iter_layers()):
+            C[step] = layer
+
+        self.option_prices = C
+        return self.option_prices
+
+    def _get_maturity_prices(self):
+        """
+        Option prices at tau = T. Rows of option prices are layers of
+        time nodes unless the solver has set other maturities
+        """
+        self._check_prices_calculated()
+        maturities = getattr(self, 'maturities', self.nodes.time_nodes)
+        indices = np.flatnonzero(
+            np.isclose(maturities, self.option.maturity)
+        )
+        if not len(indices):
+            raise ValueError(
+                'Option prices not calculated for tau = T = %f' %
+                self.option.maturity
+            )
+        return self.option_prices[indices[-1]]
+
+    def get_price_interpolator(self):
+        """
+        Spline of option prices at tau = T for prices and greeks at
+        arbitrary asset prices
+        """
+        return EuropianPriceInterpolator(
+            self.nodes.asset_price_nodes, self._get_maturity_prices()
+        )
+
     def plot_option_prices(self, time_sparse=1, asset_price_sparse=1):
         """
-        Plot option prices with respect to time and initial asset price
+        Plot option prices with respect to time and initial asset price.
+        Rows of option prices are layers of time nodes unless the solver
+        has set other maturities
         """
         asset_prices_grid, time_grid = np.meshgrid(
             self.nodes.asset_price_nodes[::asset_price_sparse],
-            self.nodes.time_nodes[::time_sparse]
+            getattr(self, 'maturities', self.nodes.time_nodes)[::time_sparse]
         )
         figure = plt.figure()
         axes = Axes3D(figure)
@@ -56,15 +187,23 @@ class FDMBaseEuropian(FDMBase):
         )
         plt.show()
 
-    def export_to_file(self, filename, points_number=None):
+    def get_analytical_prices(self):
         """
-        Export solution's data to file
+        Closed form option prices at asset price nodes or None if the
+        option has no closed form solution
         """
-
-        prices_analytical = self.option.calculate_price(
+        return self.option.calculate_price(
             self.nodes.asset_price_nodes, self.market
         )
-        prices_numerical = self.option_prices[-1][:]
+
+    def export_to_file(self, filename, points_number=None):
+        """
+        Export solution's data to file. Analytical prices and differences
+        are exported only if the option has closed form solution
+        """
+
+        prices_analytical = self.get_analytical_prices()
+        prices_numerical = self._get_maturity_prices()
 
         if not points_number:
             nodes_numbers = np.arange(len(self.nodes.asset_price_nodes))
@@ -73,6 +212,7 @@ class FDMBaseEuropian(FDMBase):
                 0, len(self.nodes.asset_price_nodes) - 1, points_number,
                 dtype='int'
             )
+        if points_number and prices_analytical is not None:
             # ensure that index of max difference in nodes_numbers
             diff_abs = np.abs(prices_analytical - prices_numerical)
             diff_argmax = np.argmax(diff_abs)
@@ -81,28 +221,24 @@ class FDMBaseEuropian(FDMBase):
             )
             nodes_numbers[index_to_replace] = diff_argmax
 
-        export_data = (
-            [
-                self.nodes.asset_price_nodes[i],
-                prices_analytical[i],
-                prices_numerical[i]
-            ] for i in nodes_numbers
-        )
-
         wb = Workbook()
         ws = wb.active
 
         ws['A1'] = 'Asset price'
-        ws['B1'] = 'Analitycal price'
         ws['C1'] = 'Numerical price'
-        ws['D1'] = 'Difference'
+        if prices_analytical is not None:
+            ws['B1'] = 'Analitycal price'
+            ws['D1'] = 'Difference'
 
         row = 2
-        for asset_price, analytical_price, num_price in export_data:
-            ws.cell(row=row, column=1).value = asset_price
-            ws.cell(row=row, column=2).value = analytical_price
-            ws.cell(row=row, column=3).value = num_price
-            ws.cell(row=row, column=4).value = analytical_price - num_price
+        for i in nodes_numbers:
+            ws.cell(row=row, column=1).value = self.nodes.asset_price_nodes[i]
+            ws.cell(row=row, column=3).value = prices_numerical[i]
+            if prices_analytical is not None:
+                ws.cell(row=row, column=2).value = prices_analytical[i]
+                ws.cell(row=row, column=4).value = (
+                    prices_analytical[i] - prices_numerical[i]
+                )
             row += 1
 
         wb.save(filename)
@@ -111,16 +247,15 @@ class FDMBaseEuropian(FDMBase):
         """
         Compare numerical solution with analytical
         """
-        if not hasattr(self, 'option_prices'):
-            raise AttributeError(
-                'Option prices not calculated yet.'
-                ' Run calculate_prices method firstly'
-            )
+        self._check_prices_calculated()
 
-        prices_analytical = self.option.calculate_price(
-            self.nodes.asset_price_nodes, self.market
-        )
-        prices_numerical = self.option_prices[-1][:]
+        prices_analytical = self.get_analytical_prices()
+        if prices_analytical is None:
+            raise ValueError(
+                "There is no analytical solution to compare with for %s" %
+                self.option.__class__.__name__
+            )
+        prices_numerical = self._get_maturity_prices()
 
         max_error = np.max(np.abs(prices_analytical - prices_numerical))
         max_error_index = np.argmax(
@@ -140,6 +275,312 @@ class FDMBaseEuropian(FDMBase):
             plt.show()
 
 
+class FDMBaseAmerican(FDMBaseEuropian):
+    """
+    Base class for finite difference schemes realizations for
+    american options pricing. Option prices are not less than payoff
+    and early exercise boundary is found for every time layer
+    """
+    def __init__(self, option, market, nodes):
+        super(FDMBaseAmerican, self).__init__(
+            option, market, nodes
+        )
+        self._payoff = self.option.calculate_payoff(
+            self.nodes.asset_price_nodes
+        )
+
+    def get_boundary_left(self, time_node):
+        """ Boundary values for S = 0 """
+        if self.option.option_type == 'put':
+            return self.option.strike + np.zeros_like(time_node, dtype=float)
+        return np.zeros_like(time_node, dtype=float)
+
+    def get_boundary_right(self, time_node):
+        """ Boundary values for S = S_max """
+        if self.option.option_type == 'put':
+            return np.zeros_like(time_node, dtype=float)
+        return super(FDMBaseAmerican, self).get_boundary_right(time_node)
+
+    def _apply_constraints(self, layer):
+        """ Projection on the payoff """
+        np.maximum(layer, self._payoff, out=layer)
+
+    def get_analytical_prices(self):
+        """ There is no closed form solution for american put """
+        if self.option.option_type == 'put':
+            return None
+        return super(FDMBaseAmerican, self).get_analytical_prices()
+
+    def get_exercise_boundary(self, option_prices):
+        """
+        Early exercise boundary for every time layer: the biggest asset
+        price of exercise region for put and the smallest one for call.
+        NaN means there is no exercise region in the layer
+        """
+        exercise = (self._payoff > 0) & (option_prices <= self._payoff)
+        asset_prices = self.nodes.asset_price_nodes
+        if self.option.option_type == 'put':
+            boundary = np.where(exercise, asset_prices, -np.inf).max(axis=-1)
+        else:
+            boundary = np.where(exercise, asset_prices, np.inf).min(axis=-1)
+        boundary[np.isinf(boundary)] = np.nan
+        return boundary
+
+    def calculate_prices(self):
+        option_prices = super(FDMBaseAmerican, self).calculate_prices()
+        self.exercise_boundary = self.get_exercise_boundary(option_prices)
+        return option_prices
+
+
+class FDMBaseAsianGrid(FDMBase):
+    """
+    Base class for asian options pricing with option prices at tau = T
+    stored on (S, A) grid
+    """
+    def __init__(self, option, market, nodes):
+        super(FDMBaseAsianGrid, self).__init__(
+            option, market, nodes
+        )
+        self._t_nodes = self.nodes.time_nodes
+        self._S_nodes = self.nodes.asset_price_nodes
+        self._A_nodes = self.nodes.average_price_nodes
+
+        self._t_number = len(self.nodes.time_nodes)
+        self._S_number = len(
+            self.nodes.asset_price_nodes
+        )
+        self._A_number = len(
+            self.nodes.average_price_nodes
+        )
+
+        self.dt = (
+            self.nodes.time_nodes[1] - self.nodes.time_nodes[0]
+        )
+        self.dS = (
+            self.nodes.asset_price_nodes[1] -
+            self.nodes.asset_price_nodes[0]
+        )
+        self.dA = (
+            self.nodes.average_price_nodes[1] -
+            self.nodes.average_price_nodes[0]
+        )
+
+    def export_to_file(self, filename):
+        """ Write computed values to file """
+        zero_volatility_solution = self.get_zero_volatility_solution()
+
+        export_data = (
+            [
+                self._S_nodes[i],
+                self._A_nodes[j],
+                self.option_prices[i, j],
+                zero_volatility_solution[i, j]
+            ] for i in range(self._S_number) for j in range(self._A_number)
+        )
+
+        wb = Workbook()
+        ws = wb.active
+
+        ws['A1'] = 'Asset price'
+        ws['B1'] = 'Average price'
+        ws['C1'] = 'Numerical price'
+        ws['D1'] = 'Zero volatility price'
+        ws['E1'] = 'Difference'
+
+        row = 2
+        for (
+            asset_price, average_price,
+            numerical_price, zero_volatility_price
+        ) in export_data:
+            ws.cell(row=row, column=1).value = asset_price
+            ws.cell(row=row, column=2).value = average_price
+            ws.cell(row=row, column=3).value = numerical_price
+            ws.cell(row=row, column=4).value = zero_volatility_price
+            ws.cell(row=row, column=5).value = (
+                numerical_price - zero_volatility_price
+            )
+            row += 1
+
+        wb.save(filename)
+
+    @staticmethod
+    def plot_difference_from_file(filename):
+        wb = load_workbook(filename)
+        ws = wb.active
+        asset_prices = [0] * (ws.max_row - 1)
+        average_prices = [0] * (ws.max_row - 1)
+        differences = [0] * (ws.max_row - 1)
+
+        index = 0
+        for row in ws.iter_rows('A2:E%d' % ws.max_row):
+            asset_prices[index] = row[0].value
+            average_prices[index] = row[1].value
+            differences[index] = row[4].value
+            index += 1
+
+        asset_prices = np.array(
+            sorted(list(set(asset_prices)))
+        )
+        average_prices = np.array(
+            sorted(list(set(average_prices)))
+        )
+
+        average_prices_grid, asset_prices_grid = np.meshgrid(
+            average_prices, asset_prices
+        )
+        print(len(differences))
+        differences_grid = np.array(differences).reshape(
+            asset_prices_grid.shape
+        )
+
+        figure = plt.figure()
+        axes = Axes3D(figure)
+        axes.plot_surface(
+            asset_prices_grid,
+            average_prices_grid,
+            differences_grid,
+            rstride=1, cstride=1, cmap=cm.YlGnBu_r
+        )
+        plt.show()
+
+    def get_price_interpolator(self):
+        """
+        Bicubic spline of option prices at tau = T for prices and greeks
+        at arbitrary asset prices and average prices
+        """
+        self._check_prices_calculated()
+        return AsianPriceInterpolator(
+            self._S_nodes, self._A_nodes, self.option_prices
+        )
+
+    def get_zero_volatility_solution(self):
+        """ Return precise solution for zero volatility at tau = T """
+        A_grid, S_grid = np.meshgrid(self._A_nodes, self._S_nodes)
+        return np.maximum(
+            (A_grid / self.option.maturity - self.option.strike) *
+            np.exp(-self.market.interest * self.option.maturity) +
+            S_grid / (self.market.interest * self.option.maturity) *
+            (1 - np.exp(-self.market.interest * self.option.maturity)), 0
+        )
+
+    def plot_option_prices(self, asset_price_sparse=1, average_price_sparse=1):
+        """
+        Plot option prices with respect to initial asset price and
+        average asset price
+        """
+        average_prices_grid, asset_prices_grid = np.meshgrid(
+            self.nodes.average_price_nodes[::average_price_sparse],
+            self.nodes.asset_price_nodes[::asset_price_sparse]
+        )
+        figure = plt.figure()
+        axes = Axes3D(figure)
+        axes.plot_surface(
+            asset_prices_grid, average_prices_grid,
+            self.option_prices[::asset_price_sparse,
+                               ::average_price_sparse],
+            rstride=1, cstride=1, cmap=cm.YlGnBu_r
+        )
+        plt.show()
+
+
+class FDMBaseAsian(FDMBaseAsianGrid):
+    """
+    Base class for finite difference schemes realizations for
+    two-dimensional PDE of asian options in (S, A) variables
+    """
+    def get_memory_estimate(self):
+        itemsize = np.dtype(float).itemsize
+        return {
+            # two (S, A) layers and coefficients
+            'layers': (
+                2 * self._S_number * self._A_number + 5 * self._S_number
+            ) * itemsize,
+            'history': self._S_number * self._A_number * itemsize
+        }
+
+    # BOUNDARY VALUES
+
+    def get_boundary_left(self, time_node):
+        """ Boundary values for S = 0 """
+        return (
+            np.exp(-self.market.interest * time_node) *
+            self.option.calculate_payoff(self._A_nodes)
+        )
+
+    def get_boundary_right(self, time_node):
+        """ Boundary values for S = S_max """
+        return (
+            np.maximum(
+                np.exp(-self.market.interest * time_node) *
+                (self._A_nodes / self.option.maturity -
+                 self.option.strike) +
+                self._S_nodes[-1] /
+                (self.market.interest * self.option.maturity) *
+                (1.0 - np.exp(-self.market.interest * time_node)), 0
+            )
+        )
+
+    def get_boundary_front(self, C_j1):
+        """ Boundary values for A = 0 """
+        return C_j1
+
+    def get_boundary_back(self, time_node):
+        """ Boundary values for A = A_max"""
+        return (
+            np.exp(-self.market.interest * time_node) *
+            self.option.calculate_payoff(
+                self._A_nodes[-1]
+            ) +
+            self._S_nodes / (self.market.interest * self.option.maturity) *
+            (1 - np.exp(-self.market.interest * time_node))
+        )
+
+    # INITIAL VALUES
+    def get_initial(self):
+        """ Initial values of option prices (tau = 0) """
+        return np.tile(
+            self.option.calculate_payoff(self._A_nodes),
+            (self._S_number, 1)
+        )
+
+    # COEFFICIENTS OF FINITE DIFFERENCE SCHEME
+    def get_coeffs_center(self):
+        """ Coefficients for C_jk """
+        return (
+            1 - self.dt * (np.arange(
+                self._S_number)**2 *
+                self.market.volatility**2 / 2.0 + self.market.interest)
+        )
+
+    def get_coeffs_right(self):
+        """ Coefficients for C_{j+1,k} """
+        S_range = np.arange(self._S_number)
+        return (
+            self.dt / 2.0 * (S_range**2 * self.market.volatility**2 / 2.0 +
+                             S_range * self.market.interest)
+        )
+
+    def get_coeffs_left(self):
+        """ Coefficients for C_{j-1,k} """
+        S_range = np.arange(self._S_number)
+        return self.dt / 2.0 * (S_range**2 * self.market.volatility**2 / 2.0 -
+                                S_range * self.market.interest)
+
+    def get_coeffs_front(self):
+        """ Coefficients for C_{j,k+1} """
+        return (
+            np.arange(self._S_number) *
+            self.dS * self.dt / (2.0 * self.dA)
+        )
+
+    def get_coeffs_back(self):
+        """ Coefficients for C_{j,k-1} """
+        return (
+            -np.arange(self._S_number) *
+            self.dS * self.dt / (2.0 * self.dA)
+        )
+
+
 class Nodes(object):
     def __init__(self, nodes_data):
         """
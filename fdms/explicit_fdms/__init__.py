@@ -1,2 +1,3 @@
+from .american_option_fdm import AmericanOptionExplicitFDM
 from .asian_option_fdm import AsianOptionExplicitFDM
 from .europian_option_fdm import EuropianOptionExplicitFDM
@@ -0,0 +1,13 @@
+# -*- coding: utf-8 -*-
+""" Explicit finite difference scheme for american options """
+
+from ..core import FDMBaseAmerican
+from .europian_option_fdm import EuropianOptionExplicitFDM
+
+
+class AmericanOptionExplicitFDM(FDMBaseAmerican, EuropianOptionExplicitFDM):
+    """
+    Explicit Euler scheme realization for Black-Scholes PDE
+    for american call or put option. Every time layer is projected on
+    the payoff
+    """
@@ -1,243 +1,218 @@
 # -*- coding: utf-8 -*-
 """ Explicit finite difference scheme for asian options """
 
+import os
 import time
 
 import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib import cm
-from openpyxl import (
-    Workbook,
-    load_workbook
-)
-from mpl_toolkits.mplot3d import Axes3D
 
-from ..core import FDMBase
+from ..core import FDMBaseAsian
 
 
-class AsianOptionExplicitFDM(FDMBase):
+class AsianOptionExplicitFDM(FDMBaseAsian):
     """
-    Explicit Euler scheme realization for Black-Scholes PDE
-    for vanilla europian option
+    Explicit Euler scheme realization for two-dimensional PDE of
+    arithmetic average fixed strike asian option.
+
+    Explicit Euler step of central difference of the advection term
+    S dC/dA amplifies oscillations in A for any time step, since there
+    is no diffusion in A. So Lax-Wendroff term nu^2 / 2 (C_{j,k+1} -
+    2 C_jk + C_{j,k-1}) with Courant number nu = dt S_j / dA is added,
+    which keeps second order of approximation in A.
     """
 
-    def __init__(self, option, market, nodes):
-        # fdm parameters
-        super(AsianOptionExplicitFDM, self).__init__(option, market, nodes)
+    def _get_courant_numbers(self, dt):
+        """ dt * S / dA in every asset price node """
+        return np.arange(self._S_number) * self.dS * dt / self.dA
 
-        self._t_nodes = self.nodes.time_nodes
-        self._S_nodes = self.nodes.asset_price_nodes
-        self._A_nodes = self.nodes.average_price_nodes
-
-        self._t_number = len(self.nodes.time_nodes)
-        self._S_number = len(
-            self.nodes.asset_price_nodes
-        )
-        self._A_number = len(
-            self.nodes.average_price_nodes
-        )
-
-        self.dt = (
-            self.nodes.time_nodes[1] - self.nodes.time_nodes[0]
-        )
-        self.dS = (
-            self.nodes.asset_price_nodes[1] -
-            self.nodes.asset_price_nodes[0]
-        )
-        self.dA = (
-            self.nodes.average_price_nodes[1] -
-            self.nodes.average_price_nodes[0]
-        )
-
-    # BOUNDARY VALUES
-
-    def get_boundary_left(self, time_node):
-        """ Boundary values for S = 0 """
-        return (
-            np.exp(-self.market.interest * time_node) *
-            self.option.calculate_payoff(self._A_nodes)
-        )
-
-    def get_boundary_right(self, time_node):
-        """ Boundary values for S = S_max """
-        return (
-            np.maximum(
-                np.exp(-self.market.interest * time_node) *
-                (self._A_nodes / self.option.maturity -
-                 self.option.strike) +
-                self._S_nodes[-1] /
-                (self.market.interest * self.option.maturity) *
-                (1.0 - np.exp(-self.market.interest * time_node)), 0
-            )
-        )
-
-    def get_boundary_front(self, C_j1):
-        """ Boundary values for A = 0 """
-        return C_j1
-
-    def get_boundary_back(self, time_node):
-        """ Boundary values for A = A_max"""
-        return (
-            np.exp(-self.market.interest * time_node) *
-            self.option.calculate_payoff(
-                self._A_nodes[-1]
-            ) +
-            self._S_nodes / (self.market.interest * self.option.maturity) *
-            (1 - np.exp(-self.market.interest * time_node))
-        )
-
-    # INITIAL VALUES
-    def get_initial(self):
-        """ Initial values of option prices (tau = 0) """
-        return np.tile(
-            self.option.calculate_payoff(self._A_nodes),
-            (self._S_number, 1)
-        )
-
-    # COEFFICIENTS OF FINITE DIFFERENCE SCHEME
     def get_coeffs_center(self):
         """ Coefficients for C_jk """
         return (
-            1 - self.dt * (np.arange(
-                self._S_number)**2 *
-                self.market.volatility**2 / 2.0 + self.market.interest)
-        )
-
-    def get_coeffs_right(self):
-        """ Coefficients for C_{j+1,k} """
-        S_range = np.arange(self._S_number)
-        return (
-            self.dt / 2.0 * (S_range**2 * self.market.volatility**2 / 2.0 +
-                             S_range * self.market.interest)
+            super(AsianOptionExplicitFDM, self).get_coeffs_center() -
+            self._get_courant_numbers(self.dt)**2
         )
 
-    def get_coeffs_left(self):
-        """ Coefficients for C_{j-1,k} """
-        S_range = np.arange(self._S_number)
-        return self.dt / 2.0 * (S_range**2 * self.market.volatility**2 / 2.0 -
-                                S_range * self.market.interest)
-
     def get_coeffs_front(self):
         """ Coefficients for C_{j,k+1} """
-        return (
-            np.arange(self._S_number) *
-            self.dS * self.dt / (2.0 * self.dA)
-        )
+        courant_numbers = self._get_courant_numbers(self.dt)
+        return (courant_numbers + courant_numbers**2) / 2.0
 
     def get_coeffs_back(self):
         """ Coefficients for C_{j,k-1} """
-        return (
-            -np.arange(self._S_number) *
-            self.dS * self.dt / (2.0 * self.dA)
-        )
+        courant_numbers = self._get_courant_numbers(self.dt)
+        return (-courant_numbers + courant_numbers**2) / 2.0
 
-    def export_to_file(self, filename):
-        """ Write computed values to file """
-        zero_volatility_solution = self.get_zero_volatility_solution()
-
-        export_data = (
-            [
-                self._S_nodes[i],
-                self._A_nodes[j],
-                self.option_prices[i, j],
-                zero_volatility_solution[i, j]
-            ] for i in range(self._S_number) for j in range(self._A_number)
+    def get_amplification(self, dt, wave_numbers_count=33):
+        """
+        Maximum absolute value of amplification factor of the scheme
+        with time step dt over inner nodes (coefficients are frozen) and
+        Fourier modes with wave_numbers_count angles in S and A
+        directions
+        """
+        # coefficients in S are proportional to dt, axes of arrays are
+        # (market scenarios, angles in S, nodes)
+        scale = dt / self.dt
+        center = (
+            super(AsianOptionExplicitFDM, self).get_coeffs_center() - 1.0
+        )[..., np.newaxis, 1:-1] * scale
+        right = self.get_coeffs_right()[..., np.newaxis, 1:-1] * scale
+        left = self.get_coeffs_left()[..., np.newaxis, 1:-1] * scale
+        courant_numbers = self._get_courant_numbers(dt)[1:-1]
+
+        theta = np.linspace(0.0, np.pi, wave_numbers_count)[:, np.newaxis]
+        S_factor = (
+            1.0 + center + right * np.exp(1j * theta) +
+            left * np.exp(-1j * theta)
         )
-
-        wb = Workbook()
-        ws = wb.active
-
-        ws['A1'] = 'Asset price'
-        ws['B1'] = 'Average price'
-        ws['C1'] = 'Numerical price'
-        ws['D1'] = 'Zero volatility price'
-        ws['E1'] = 'Difference'
-
-        row = 2
-        for (
-            asset_price, average_price,
-            numerical_price, zero_volatility_price
-        ) in export_data:
-            ws.cell(row=row, column=1).value = asset_price
-            ws.cell(row=row, column=2).value = average_price
-            ws.cell(row=row, column=3).value = numerical_price
-            ws.cell(row=row, column=4).value = zero_volatility_price
-            ws.cell(row=row, column=5).value = (
-                numerical_price - zero_volatility_price
+        amplification = 0.0
+        # modes (-theta, -phi) have conjugate factors
+        for phi in np.linspace(-np.pi, np.pi, 2 * wave_numbers_count - 1):
+            factor = (
+                S_factor -
+                courant_numbers**2 * (1.0 - np.cos(phi)) +
+                1j * courant_numbers * np.sin(phi)
             )
-            row += 1
+            amplification = max(amplification, np.max(np.abs(factor)))
+        return amplification
 
-        wb.save(filename)
+    def get_max_stable_dt(self, relative_tolerance=1e-3):
+        """
+        Maximum time step for which Fourier modes are not amplified (von
+        Neumann analysis with frozen coefficients), found by bisection
+        """
+        def is_stable(dt):
+            return self.get_amplification(dt) <= 1.0 + 1e-12
+
+        high = self.option.maturity
+        if is_stable(high):
+            return high
+        low = high / 2.0
+        while not is_stable(low):
+            high, low = low, low / 2.0
+        while high - low > relative_tolerance * low:
+            middle = (low + high) / 2.0
+            if is_stable(middle):
+                low = middle
+            else:
+                high = middle
+        return low
+
+    # CHECKPOINTS
+    def save_checkpoint(self, filename, layer, step):
+        """
+        Write current layer, step index and solver parameters to binary
+        file. File is replaced atomically, so it always contains the
+        complete latest checkpoint
+        """
+        temporary_filename = filename + '.tmp'
+        with open(temporary_filename, 'wb') as checkpoint_file:
+            np.savez(
+                checkpoint_file,
+                layer=layer,
+                step=step,
+                market=[self.market.interest, self.market.volatility],
+                option=[self.option.strike, self.option.maturity],
+                time_interval=self.nodes.time_interval,
+                time_nodes_count=self._t_number,
+                asset_price_interval=self.nodes.asset_price_interval,
+                asset_price_nodes_count=self._S_number,
+                average_price_interval=self.nodes.average_price_interval,
+                average_price_nodes_count=self._A_number
+            )
+        os.rename(temporary_filename, filename)
 
     @staticmethod
-    def plot_difference_from_file(filename):
-        wb = load_workbook(filename)
-        ws = wb.active
-        asset_prices = [0] * (ws.max_row - 1)
-        average_prices = [0] * (ws.max_row - 1)
-        differences = [0] * (ws.max_row - 1)
-
-        index = 0
-        for row in ws.iter_rows('A2:E%d' % ws.max_row):
-            asset_prices[index] = row[0].value
-            average_prices[index] = row[1].value
-            differences[index] = row[4].value
-            index += 1
-
-        asset_prices = np.array(
-            sorted(list(set(asset_prices)))
-        )
-        average_prices = np.array(
-            sorted(list(set(average_prices)))
-        )
-
-        average_prices_grid, asset_prices_grid = np.meshgrid(
-            average_prices, asset_prices
-        )
-        print len(differences)
-        differences_grid = np.array(differences).reshape(
-            asset_prices_grid.shape
-        )
-
-        figure = plt.figure()
-        axes = Axes3D(figure)
-        axes.plot_surface(
-            asset_prices_grid,
-            average_prices_grid,
-            differences_grid,
-            rstride=1, cstride=1, cmap=cm.YlGnBu_r
-        )
-        plt.show()
+    def load_checkpoint(filename):
+        """
+        Read checkpoint written by save_checkpoint.
+        :return: dict with layer, step, interest, volatility, strike,
+        maturity and nodes_data for Nodes
+        """
+        with open(filename, 'rb') as checkpoint_file:
+            data = np.load(checkpoint_file)
+            return {
+                'layer': data['layer'],
+                'step': int(data['step']),
+                'interest': float(data['market'][0]),
+                'volatility': float(data['market'][1]),
+                'strike': float(data['option'][0]),
+                'maturity': float(data['option'][1]),
+                'nodes_data': [
+                    (data['%s_interval' % name].tolist(),
+                     int(data['%s_nodes_count' % name]), name)
+                    for name in ['time', 'asset_price', 'average_price']
+                ]
+            }
+
+    def _check_checkpoint(self, checkpoint):
+        parameters = [
+            self.market.interest, self.market.volatility,
+            self.option.strike, self.option.maturity
+        ] + [
+            (list(getattr(self.nodes, '%s_interval' % name)),
+             len(getattr(self.nodes, '%s_nodes' % name)), name)
+            for name in ['time', 'asset_price', 'average_price']
+        ]
+        checkpoint_parameters = [
+            checkpoint['interest'], checkpoint['volatility'],
+            checkpoint['strike'], checkpoint['maturity']
+        ] + checkpoint['nodes_data']
+        if parameters != checkpoint_parameters:
+            raise ValueError(
+                "Checkpoint was created for other solver parameters"
+            )
 
-    def get_zero_volatility_solution(self):
-        """ Return precise solution for zero volatility at tau = T """
-        A_grid, S_grid = np.meshgrid(self._A_nodes, self._S_nodes)
-        return np.maximum(
-            (A_grid / self.option.maturity - self.option.strike) *
-            np.exp(-self.market.interest * self.option.maturity) +
-            S_grid / (self.market.interest * self.option.maturity) *
-            (1 - np.exp(-self.market.interest * self.option.maturity)), 0
-        )
+    def iter_layers(self, checkpoint_path=None, checkpoint_steps=None,
+                    checkpoint_seconds=None, resume=False):
+        """
+        Generator of (tau, layer) for every time layer on (S, A) grid.
 
-    def calculate_prices(self):
+        If checkpoint_path is given, current layer is saved every
+        checkpoint_steps steps and/or every checkpoint_seconds seconds.
+        With resume=True calculation continues from the checkpoint and
+        gives the same result as uninterrupted run.
+        """
         start = time.time()
         print("Begin: %s" % str(time.time() - start))
 
-        coeffs_center = self.get_coeffs_center()
-        coeffs_right = self.get_coeffs_right()
-        coeffs_left = self.get_coeffs_left()
-        coeffs_front = self.get_coeffs_front()
-        coeffs_back = self.get_coeffs_back()
+        (
+            coeffs_center, coeffs_right, coeffs_left,
+            coeffs_front, coeffs_back
+        ) = self._get_cached(
+            'asian_explicit',
+            lambda: (
+                self.get_coeffs_center(), self.get_coeffs_right(),
+                self.get_coeffs_left(), self.get_coeffs_front(),
+                self.get_coeffs_back()
+            ),
+            self.dt, self.dS, self.dA, self._S_number
+        )
 
         print(
             "Coeffs were counted succesfully: %s" %
             str(time.time() - start)
         )
 
-        C_next = np.zeros((self._S_number, self._A_number))
-        C_current = self.get_initial()
-
-        for time_node in self.nodes.time_nodes[1:]:
+        layer_shape = (
+            self._get_batch_shape() + (self._S_number, self._A_number)
+        )
+        C_next = np.zeros(layer_shape)
+        if resume:
+            checkpoint = self.load_checkpoint(checkpoint_path)
+            self._check_checkpoint(checkpoint)
+            start_step = checkpoint['step']
+            C_current = checkpoint['layer']
+            print("Resumed from step %d" % start_step)
+        else:
+            start_step = 0
+            C_current = np.broadcast_to(
+                self.get_initial(), layer_shape
+            ).astype(float)
+        last_checkpoint_time = time.time()
+
+        yield self.nodes.time_nodes[start_step], C_current
+        for step in range(start_step + 1, self._t_number):
+            time_node = self.nodes.time_nodes[step]
             # every 100th iteration print time info
             if not int(time_node * self._t_number) % 100:
                 print(
@@ -249,56 +224,56 @@ class AsianOptionExplicitFDM(FDMBase):
                 )
 
             # values inside the area
-            C_next[1:self._S_number - 1, 1:self._A_number - 1] = (
-                C_current[1:self._S_number - 1,
-                          1:self._A_number - 1] *
-                coeffs_center[1:self._S_number - 1, np.newaxis] +
-                C_current[0:self._S_number - 2,
-                          1:self._A_number - 1] *
-                coeffs_left[1:self._S_number - 1, np.newaxis] +
-                C_current[2:self._S_number, 1:self._A_number - 1] *
-                coeffs_right[1:self._S_number - 1, np.newaxis] +
-                C_current[1:self._S_number - 1,
-                          0:self._A_number - 2] *
-                coeffs_back[1:self._S_number - 1, np.newaxis] +
-                C_current[1:self._S_number - 1, 2:self._A_number] *
-                coeffs_front[1:self._S_number - 1, np.newaxis]
+            C_next[..., 1:-1, 1:-1] = (
+                C_current[..., 1:-1, 1:-1] *
+                coeffs_center[..., 1:-1, np.newaxis] +
+                C_current[..., 0:-2, 1:-1] *
+                coeffs_left[..., 1:-1, np.newaxis] +
+                C_current[..., 2:, 1:-1] *
+                coeffs_right[..., 1:-1, np.newaxis] +
+                C_current[..., 1:-1, 0:-2] *
+                coeffs_back[..., 1:-1, np.newaxis] +
+                C_current[..., 1:-1, 2:] *
+                coeffs_front[..., 1:-1, np.newaxis]
             )
 
             # boundary values
-            C_next[0] = (  # S = 0
+            C_next[..., 0, :] = (  # S = 0
                 self.get_boundary_left(time_node)
             )
-            C_next[self._S_number - 1] = (  # S = S_max
+            C_next[..., -1, :] = (  # S = S_max
                 self.get_boundary_right(time_node)
             )
-            C_next[:, 0] = (  # A = 0
-                self.get_boundary_front(C_next[:, 1])
+            C_next[..., 0] = (  # A = 0
+                self.get_boundary_front(C_next[..., 1])
             )
-            C_next[:, self._A_number - 1] = (  # A = A_max
+            C_next[..., -1] = (  # A = A_max
                 self.get_boundary_back(time_node)
             )
-            C_current = C_next.copy()
+            # layers are swapped instead of copying
+            C_current, C_next = C_next, C_current
 
-        self.option_prices = C_current
+            if checkpoint_path and (
+                checkpoint_steps and not step % checkpoint_steps or
+                checkpoint_seconds and
+                time.time() - last_checkpoint_time >= checkpoint_seconds
+            ):
+                self.save_checkpoint(checkpoint_path, C_current, step)
+                last_checkpoint_time = time.time()
 
-        return C_current
+            yield time_node, C_current
 
-    def plot_option_prices(self, asset_price_sparse=1, average_price_sparse=1):
+    def calculate_prices(self, checkpoint_path=None, checkpoint_steps=None,
+                         checkpoint_seconds=None, resume=False):
         """
-        Plot option prices with respect to initial asset price and
-        average asset price
+        Calculate option prices at tau = T. Checkpoint parameters are
+        described in iter_layers
         """
-        average_prices_grid, asset_prices_grid = np.meshgrid(
-            self.nodes.average_price_nodes[::average_price_sparse],
-            self.nodes.asset_price_nodes[::asset_price_sparse]
-        )
-        figure = plt.figure()
-        axes = Axes3D(figure)
-        axes.plot_surface(
-            asset_prices_grid, average_prices_grid,
-            self.option_prices[::asset_price_sparse,
-                               ::average_price_sparse],
-            rstride=1, cstride=1, cmap=cm.YlGnBu_r
-        )
-        plt.show()
+        for tau, layer in self.iter_layers(
+            checkpoint_path, checkpoint_steps, checkpoint_seconds, resume
+        ):
+            pass
+
+        self.option_prices = layer.copy()
+
+        return self.option_prices
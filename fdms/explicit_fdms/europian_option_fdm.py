@@ -1,8 +1,6 @@
 # -*- coding: utf-8 -*-
 """ Explicit finite difference scheme for europian options """
 
-import math
-
 import numpy as np
 
 from ..core import FDMBaseEuropian
@@ -18,6 +16,12 @@ class EuropianOptionExplicitFDM(FDMBaseEuropian):
         C_j^{n+1} = alpha * C_{j-1}^n + beta * C_j^n + gamma * C_{j+1}^n
         :return: FDM coefficients
         """
+        return self._get_cached(
+            'europian_explicit', self._calculate_fdm_coefficients,
+            self.dt, len(self.nodes.asset_price_nodes)
+        )
+
+    def _calculate_fdm_coefficients(self):
         j_nodes = np.arange(0, len(self.nodes.asset_price_nodes))
         alpha = (
             -self.market.interest * j_nodes / 2.0 * self.dt +
@@ -33,34 +37,33 @@ class EuropianOptionExplicitFDM(FDMBaseEuropian):
         )
         return alpha, beta, gamma
 
-    def calculate_prices(self):
-        time_nodes_count = len(self.nodes.time_nodes)
-        asset_price_nodes_count = len(self.nodes.asset_price_nodes)
-        C_0 = [
-            self.option.calculate_payoff(price)
-            for price in self.nodes.asset_price_nodes
-        ]
-        C = np.zeros(
-            (time_nodes_count, asset_price_nodes_count)
+    def get_max_stable_dt(self):
+        """ Maximum time step for which all beta are not negative """
+        return 1.0 / (
+            self.market.volatility**2 *
+            (len(self.nodes.asset_price_nodes) - 1)**2 +
+            self.market.interest
         )
-        C[0] = C_0
+
+    def iter_layers(self):
+        C_current = np.broadcast_to(
+            self.option.calculate_payoff(self.nodes.asset_price_nodes),
+            self._get_batch_shape() + (len(self.nodes.asset_price_nodes),)
+        ).astype(float)
+        C_next = np.empty_like(C_current)
         alpha, beta, gamma = self.get_fdm_coefficients()
 
-        for step in range(1, time_nodes_count):
+        yield 0.0, C_current
+        for step in range(1, len(self.nodes.time_nodes)):
             time = self.option.maturity - step * self.dt
             tau = self.option.maturity - time
-            C_next = (
-                alpha[1:-1] * C[step - 1][0:-2] +
-                beta[1:-1] * C[step - 1][1:-1] +
-                gamma[1:-1] * C[step - 1][2:]
-            )
-            C_next = (
-                [0.0] + list(C_next) +
-                [self.nodes.asset_price_nodes[-1] -
-                    self.option.strike *
-                    math.exp(-self.market.interest * tau)]
+            C_next[..., 1:-1] = (
+                alpha[..., 1:-1] * C_current[..., 0:-2] +
+                beta[..., 1:-1] * C_current[..., 1:-1] +
+                gamma[..., 1:-1] * C_current[..., 2:]
             )
-            C[step] = np.array(C_next)
-
-        self.option_prices = C
-        return self.option_prices
+            C_next[..., :1] = self.get_boundary_left(tau)
+            C_next[..., -1:] = self.get_boundary_right(tau)
+            self._apply_constraints(C_next)
+            C_current, C_next = C_next, C_current
+            yield tau, C_current
@@ -1 +1,4 @@
-from .europian_option_fdm import EuropianOptionImplicitFDM
\ No newline at end of file
+from .american_option_fdm import AmericanOptionImplicitFDM
+from .asian_option_fdm import AsianOptionImplicitFDM
+from .asian_option_reduced_fdm import AsianOptionReducedFDM
+from .europian_option_fdm import EuropianOptionImplicitFDM
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+""" Implicit finite difference scheme for american options """
+
+from ..core import FDMBaseAmerican
+from ..tridiagonal import (
+    factorize_tridiagonal,
+    solve_tridiagonal
+)
+from .europian_option_fdm import EuropianOptionImplicitFDM
+
+
+class AmericanOptionImplicitFDM(FDMBaseAmerican, EuropianOptionImplicitFDM):
+    """
+    Implicit Euler scheme realization for Black-Scholes PDE
+    for american call or put option.
+
+    Every time layer is found by projected Thomas algorithm of
+    Brennan and Schwartz. Back substitution has to start from the
+    exercise region, so for put the system is solved in reversed order
+    """
+    def _get_y(self, dt):
+        if self.option.option_type == 'put':
+            alpha, beta, gamma = self._get_coefficients(dt)
+            return self._get_cached(
+                'american_put_implicit_y',
+                lambda: factorize_tridiagonal(
+                    gamma[..., ::-1], beta[..., ::-1], alpha[..., ::-1]
+                ),
+                dt, len(self.nodes.asset_price_nodes)
+            )
+        return super(AmericanOptionImplicitFDM, self)._get_y(dt)
+
+    def _solve_layer(self, q, dt):
+        alpha, beta, gamma = self._get_coefficients(dt)
+        y = self._get_y(dt)
+        payoff = self._payoff[1:-1]
+        if self.option.option_type == 'put':
+            return solve_tridiagonal(
+                gamma[..., ::-1], alpha[..., ::-1], y, q[..., ::-1],
+                payoff[::-1]
+            )[..., ::-1]
+        return solve_tridiagonal(alpha, gamma, y, q, payoff)
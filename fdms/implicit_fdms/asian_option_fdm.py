@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+""" Implicit finite difference scheme for asian options """
+
+import numpy as np
+
+from ..assembly import AsianOperator
+from ..core import FDMBaseAsian
+
+
+class AsianOptionImplicitFDM(FDMBaseAsian):
+    """
+    Theta scheme realization for two-dimensional PDE of arithmetic
+    average fixed strike asian option on (S, A) grid. theta = 1 gives
+    implicit Euler scheme, theta = 0.5 gives Crank-Nicolson scheme.
+
+    Discretisation and boundary rules are the same as in
+    AsianOptionExplicitFDM, the sparse operator is assembled by
+    AsianOperator. Every layer is found by sparse LU factorization
+    (linear_solver = 'lu') or by preconditioned BiCGSTAB
+    (linear_solver = 'bicgstab') with relative residual tolerance.
+    """
+    # order of local truncation error in time is order + 1
+    order = 1
+
+    def __init__(self, option, market, nodes, theta=1.0,
+                 linear_solver='lu', tolerance=1e-10):
+        super(AsianOptionImplicitFDM, self).__init__(option, market, nodes)
+        self.theta = theta
+        self.linear_solver = linear_solver
+        self.tolerance = tolerance
+        if theta == 0.5:
+            self.order = 2
+        self.operator = AsianOperator(self)
+
+    def get_memory_estimate(self):
+        itemsize = np.dtype(float).itemsize
+        nodes_count = self._S_number * self._A_number
+        return {
+            # layers, sparse matrices and LU factors, whose fill-in is
+            # about the bandwidth A_number in every row
+            'layers': (
+                4 * nodes_count * itemsize +
+                15 * nodes_count * (itemsize + 4) +
+                2 * nodes_count * self._A_number * (itemsize + 4)
+            ),
+            'history': nodes_count * itemsize
+        }
+
+    def iter_layers(self):
+        layer = self.get_initial()
+        yield self.nodes.time_nodes[0], layer
+        for time_node in self.nodes.time_nodes[1:]:
+            layer = self.operator.implicit_step(
+                layer, time_node, self.theta, self.linear_solver,
+                self.tolerance
+            )
+            yield time_node, layer
+
+    def calculate_prices(self):
+        """ Calculate option prices at tau = T """
+        for tau, layer in self.iter_layers():
+            pass
+
+        self.option_prices = layer.copy()
+        return self.option_prices
@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+"""
+Implicit finite difference scheme for asian options based on
+dimension reduction of Vecer
+"""
+
+import numpy as np
+
+from ..core import FDMBaseAsianGrid
+from ..tridiagonal import (
+    factorize_tridiagonal,
+    solve_tridiagonal
+)
+
+
+class AsianOptionReducedFDM(FDMBaseAsianGrid):
+    """
+    Implicit Euler scheme realization for one-dimensional PDE of
+    arithmetic average fixed strike asian option.
+
+    Option price is C(S, A, tau) = S * u(tau, z) where
+    z = q(tau) + exp(-r * tau) * (A / T - K) / S,
+    q(tau) = (1 - exp(-r * tau)) / (r * T) and u solves
+    u_tau = sigma^2 / 2 * (q(tau) - z)^2 * u_zz, u(0, z) = max(z, 0).
+
+    Nodes must contain reduced_variable nodes for z. Prices are
+    interpolated from z nodes to (S, A) grid given by asset_price and
+    average_price nodes, so the solution can be compared with
+    AsianOptionExplicitFDM node by node.
+    """
+
+    def __init__(self, option, market, nodes):
+        super(AsianOptionReducedFDM, self).__init__(option, market, nodes)
+
+        self._z_nodes = self.nodes.reduced_variable_nodes
+        self.dz = self._z_nodes[1] - self._z_nodes[0]
+
+        if self._z_nodes[-1] < self.get_hedge_ratio(self.option.maturity):
+            raise ValueError(
+                "Maximum of reduced variable nodes must be not less than %f" %
+                self.get_hedge_ratio(self.option.maturity)
+            )
+
+    def get_hedge_ratio(self, time_node):
+        """ Number of assets q(tau) in replicating portfolio """
+        if not self.market.interest:
+            return time_node / self.option.maturity
+        return (
+            -np.expm1(-self.market.interest * time_node) /
+            (self.market.interest * self.option.maturity)
+        )
+
+    def get_memory_estimate(self):
+        itemsize = np.dtype(float).itemsize
+        return {
+            # layer, coefficients and factorization on z nodes
+            'layers': 6 * len(self._z_nodes) * itemsize,
+            # prices and (S, A) meshgrid
+            'history': 3 * self._S_number * self._A_number * itemsize
+        }
+
+    # BOUNDARY VALUES
+
+    def get_boundary_left(self, time_node):
+        """ Boundary value for z = z_min """
+        return 0.0
+
+    def get_boundary_right(self, time_node):
+        """
+        Boundary value for z = z_max. Average price is already above
+        strike for z >= q(tau), so the solution is linear there
+        """
+        return self._z_nodes[-1]
+
+    # INITIAL VALUES
+    def get_initial(self):
+        """ Initial values of u (tau = 0) """
+        return np.maximum(self._z_nodes, 0)
+
+    # COEFFICIENTS OF FINITE DIFFERENCE SCHEME
+    def get_coefficients(self, time_node):
+        """
+        -a * u_{j-1}^{n+1} + (1 + 2a) * u_j^{n+1} - a * u_{j+1}^{n+1} = u_j^n
+        :return: FDM coefficients for inner nodes
+        """
+        a = (
+            self.market.volatility**2 / 2.0 *
+            (self.get_hedge_ratio(time_node) - self._z_nodes[1:-1])**2 *
+            self.dt / self.dz**2
+        )
+        return -a, 1 + 2 * a, -a
+
+    def iter_layers(self):
+        """
+        Generator of (tau, layer) where layer contains values of u in
+        reduced variable nodes
+        """
+        u = self.get_initial()
+        yield self.nodes.time_nodes[0], u
+
+        for time_node in self.nodes.time_nodes[1:]:
+            alpha, beta, gamma = self.get_coefficients(time_node)
+            y = factorize_tridiagonal(alpha, beta, gamma)
+
+            u_left = self.get_boundary_left(time_node)
+            u_right = self.get_boundary_right(time_node)
+            q = u[1:-1].copy()
+            q[0] -= alpha[0] * u_left
+            q[-1] -= gamma[-1] * u_right
+
+            u = np.concatenate((
+                [u_left], solve_tridiagonal(alpha, gamma, y, q), [u_right]
+            ))
+            yield time_node, u
+
+    def calculate_prices(self):
+        for tau, u in self.iter_layers():
+            pass
+
+        self.reduced_prices = u
+        A_grid, S_grid = np.meshgrid(self._A_nodes, self._S_nodes)
+        self.option_prices = self._interpolate_prices(S_grid, A_grid)
+
+        return self.option_prices
+
+    def get_prices(self, asset_prices, average_prices):
+        """
+        Option prices at tau = T for arbitrary asset prices and average
+        prices
+        """
+        self._check_prices_calculated()
+        return self._interpolate_prices(asset_prices, average_prices)
+
+    def _interpolate_prices(self, asset_prices, average_prices):
+        asset_prices, average_prices = np.broadcast_arrays(
+            np.asarray(asset_prices, dtype=float),
+            np.asarray(average_prices, dtype=float)
+        )
+        discounted_payoff = (
+            np.exp(-self.market.interest * self.option.maturity) *
+            (average_prices / self.option.maturity - self.option.strike)
+        )
+        positive = asset_prices > 0
+        safe_asset_prices = np.where(positive, asset_prices, 1.0)
+        z = (
+            self.get_hedge_ratio(self.option.maturity) +
+            discounted_payoff / safe_asset_prices
+        )
+        u = np.where(
+            z > self._z_nodes[-1], z,
+            np.interp(z, self._z_nodes, self.reduced_prices, left=0.0)
+        )
+        return np.where(
+            positive, asset_prices * u, np.maximum(discounted_payoff, 0)
+        )
+
+    def compare_with_fdm(self, fdm):
+        """
+        Compare solution with finite difference solution of
+        two-dimensional PDE in inner nodes of its (S, A) grid
+        """
+        fdm._check_prices_calculated()
+        A_grid, S_grid = np.meshgrid(
+            fdm.nodes.average_price_nodes[1:-1],
+            fdm.nodes.asset_price_nodes[1:-1]
+        )
+        prices_reduced = self.get_prices(S_grid, A_grid)
+        prices_numerical = fdm.option_prices[1:-1, 1:-1]
+
+        differences = np.abs(prices_reduced - prices_numerical)
+        max_error_index = np.unravel_index(
+            np.argmax(differences), differences.shape
+        )
+
+        print("Max difference: %f" % differences[max_error_index])
+        print("Asset price: %f, average price: %f" % (
+            S_grid[max_error_index], A_grid[max_error_index]
+        ))
+        print("Reduced PDE price: %f" % prices_reduced[max_error_index])
+        print("Numerical price: %f" % prices_numerical[max_error_index])
+
+        return differences
@@ -4,6 +4,11 @@
 import numpy as np
 
 from ..core import FDMBaseEuropian
+from ..tridiagonal import (
+    factorize_batched_tridiagonal,
+    factorize_tridiagonal,
+    solve_tridiagonal
+)
 
 
 class EuropianOptionImplicitFDM(FDMBaseEuropian):
@@ -11,29 +16,31 @@ class EuropianOptionImplicitFDM(FDMBaseEuropian):
     Implicit Euler scheme realization for Black-Scholes PDE
     for vanilla europian option
     """
-    @property
-    def _coefficients(self):
-        j_points = np.arange(1, len(self.nodes.asset_price_nodes) - 1)
-
-        if not hasattr(self, 'alpha_'):
-            self.alpha_ = (
-                (self.market.interest * j_points -
-                 self.market.volatility ** 2 * j_points ** 2) * self.dt / 2.0
-            )
-
-        if not hasattr(self, 'beta_'):
-            self.beta_ = (
-                1 + (self.market.volatility ** 2 * j_points ** 2 +
-                     self.market.interest) * self.dt
-            )
-
-        if not hasattr(self, 'gamma_'):
-            self.gamma_ = (
-                -(self.market.interest * j_points +
-                  self.market.volatility ** 2 * j_points ** 2) * self.dt / 2.0
-            )
+    # order of local truncation error in time is order + 1
+    order = 1
+
+    def _get_coefficients(self, dt):
+        return self._get_cached(
+            'europian_implicit',
+            lambda: self._calculate_coefficients(dt),
+            dt, len(self.nodes.asset_price_nodes)
+        )
 
-        return self.alpha_, self.beta_, self.gamma_
+    def _calculate_coefficients(self, dt):
+        j_points = np.arange(1, len(self.nodes.asset_price_nodes) - 1)
+        alpha = (
+            (self.market.interest * j_points -
+             self.market.volatility ** 2 * j_points ** 2) * dt / 2.0
+        )
+        beta = (
+            1 + (self.market.volatility ** 2 * j_points ** 2 +
+                 self.market.interest) * dt
+        )
+        gamma = (
+            -(self.market.interest * j_points +
+              self.market.volatility ** 2 * j_points ** 2) * dt / 2.0
+        )
+        return alpha, beta, gamma
 
     @property
     def _initial_values(self):
@@ -43,74 +50,57 @@ class EuropianOptionImplicitFDM(FDMBaseEuropian):
             )
         return self.initial_values_
 
-    @property
-    def _left_boundary_values(self):
-        if not hasattr(self, 'left_boundary_values_'):
-            self.left_boundary_values_ = np.array(
-                [0.0] * len(self.nodes.time_nodes)
-            )
-        return self.left_boundary_values_
-
-    @property
-    def _right_boundary_values(self):
-        if not hasattr(self, 'right_boundary_values_'):
-            self.right_boundary_values_ = (
-                np.array(
-                    [self.nodes.asset_price_nodes[-1]] *
-                    len(self.nodes.time_nodes)
-                ) -
-                self.option.strike *
-                np.exp(-self.market.interest * self.nodes.time_nodes)
-            )
-        return self.right_boundary_values_
-
-    def _get_y(self):
-        y = np.zeros(len(self.nodes.asset_price_nodes) - 2)
-        y[0] = self._coefficients[1][0]
-        for i in range(0, len(y) - 1):
-            y[i + 1] = (
-                self._coefficients[1][i + 1] - self._coefficients[0][i + 1] *
-                self._coefficients[2][i] / y[i]
-            )
-        return y
-
-    def calculate_prices(self):
-        time_nodes_count = len(self.nodes.time_nodes)
-        asset_price_nodes_count = len(self.nodes.asset_price_nodes)
-        C = np.zeros(
-            (time_nodes_count, asset_price_nodes_count)
+    def _get_y(self, dt):
+        return self._get_cached(
+            'europian_implicit_y',
+            lambda: factorize_tridiagonal(*self._get_coefficients(dt)),
+            dt, len(self.nodes.asset_price_nodes)
         )
-        q = np.zeros(asset_price_nodes_count - 2)
 
-        C[0] = self._initial_values
-        alpha, beta, gamma = self._coefficients
-        y = self._get_y()
-
-        C[:, 0] = self._left_boundary_values
-        C[:, -1] = self._right_boundary_values
-
-        for time_step in range(1, time_nodes_count):
-            q[0] = (
-                C[time_step - 1][1] -
-                alpha[0] * C[time_step][0]
-            )
-            for i in range(1, len(q) - 1):
-                q[i] = (
-                    C[time_step - 1][i + 1] -
-                    alpha[i] / y[i - 1] * q[i - 1]
-                )
-            q[-1] = (
-                C[time_step - 1][-2] - gamma[-1] * C[time_step][-1] -
-                alpha[-1] / y[-2] * q[-2]
-            )
-
-            C[time_step, -2] = (
-                q[-1] / y[-1]
-            )
-            for i in range(asset_price_nodes_count - 3, 0, -1):
-                C[time_step, i] = (
-                    (q[i - 1] - gamma[i - 1] * C[time_step, i + 1]) / y[i - 1]
-                )
+    def _get_batch_factorization(self, dt):
+        return self._get_cached(
+            'europian_implicit_batch_lu',
+            lambda: factorize_batched_tridiagonal(
+                *self._get_coefficients(dt)
+            ),
+            dt, len(self.nodes.asset_price_nodes)
+        )
 
-        self.option_prices = C
-        return self.option_prices
+    def _solve_layer(self, q, dt):
+        """
+        Values in inner nodes of the next layer. Scenarios of batched
+        market data are solved as one block diagonal system
+        """
+        if q.ndim > 1:
+            return self._get_batch_factorization(dt).solve(
+                q.ravel()
+            ).reshape(q.shape)
+        alpha, beta, gamma = self._get_coefficients(dt)
+        return solve_tridiagonal(alpha, gamma, self._get_y(dt), q)
+
+    def step(self, layer, time_node, dt):
+        """
+        Calculate layer at time_node from the layer at time_node - dt.
+        Tridiagonal factorization is taken from cache, so it is calculated
+        only once for every dt
+        """
+        alpha, beta, gamma = self._get_coefficients(dt)
+        next_layer = np.empty(np.shape(layer))
+        next_layer[..., :1] = self.get_boundary_left(time_node)
+        next_layer[..., -1:] = self.get_boundary_right(time_node)
+
+        q = layer[..., 1:-1].copy()
+        q[..., :1] -= alpha[..., :1] * next_layer[..., :1]
+        q[..., -1:] -= gamma[..., -1:] * next_layer[..., -1:]
+        next_layer[..., 1:-1] = self._solve_layer(q, dt)
+        return next_layer
+
+    def iter_layers(self):
+        layer = np.broadcast_to(
+            self._initial_values,
+            self._get_batch_shape() + (len(self.nodes.asset_price_nodes),)
+        ).astype(float)
+        yield self.nodes.time_nodes[0], layer
+        for time_node in self.nodes.time_nodes[1:]:
+            layer = self.step(layer, time_node, self.dt)
+            yield time_node, layer
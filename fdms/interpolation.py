@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+""" Spline interpolation of calculated option prices between nodes """
+
+import numpy as np
+from scipy.interpolate import (
+    CubicSpline,
+    RectBivariateSpline
+)
+
+
+class EuropianPriceInterpolator(object):
+    """
+    Cubic spline of option prices with respect to asset price.
+    Spline coefficients are calculated once, prices and greeks for any
+    number of asset prices are evaluated in one vectorized call.
+    Values outside of the grid are NaN.
+    """
+    def __init__(self, asset_price_nodes, option_prices):
+        self._spline = CubicSpline(
+            asset_price_nodes, option_prices, extrapolate=False
+        )
+
+    def get_prices(self, asset_prices):
+        return self._spline(asset_prices)
+
+    def get_deltas(self, asset_prices):
+        return self._spline(asset_prices, 1)
+
+    def get_gammas(self, asset_prices):
+        return self._spline(asset_prices, 2)
+
+
+class AsianPriceInterpolator(object):
+    """
+    Bicubic spline of option prices with respect to asset price and
+    average price. Spline coefficients are calculated once, prices and
+    greeks for any number of (S, A) points are evaluated in one
+    vectorized call. Values outside of the grid are NaN.
+    """
+    def __init__(self, asset_price_nodes, average_price_nodes,
+                 option_prices):
+        self._asset_price_interval = (
+            asset_price_nodes[0], asset_price_nodes[-1]
+        )
+        self._average_price_interval = (
+            average_price_nodes[0], average_price_nodes[-1]
+        )
+        self._spline = RectBivariateSpline(
+            asset_price_nodes, average_price_nodes, option_prices,
+            kx=3, ky=3, s=0
+        )
+
+    def _evaluate(self, asset_prices, average_prices, dx=0, dy=0):
+        asset_prices, average_prices = np.broadcast_arrays(
+            np.asarray(asset_prices, dtype=float),
+            np.asarray(average_prices, dtype=float)
+        )
+        values = self._spline.ev(
+            asset_prices, average_prices, dx=dx, dy=dy
+        )
+        outside = (
+            (asset_prices < self._asset_price_interval[0]) |
+            (asset_prices > self._asset_price_interval[1]) |
+            (average_prices < self._average_price_interval[0]) |
+            (average_prices > self._average_price_interval[1])
+        )
+        return np.where(outside, np.nan, values)
+
+    def get_prices(self, asset_prices, average_prices):
+        return self._evaluate(asset_prices, average_prices)
+
+    def get_deltas(self, asset_prices, average_prices):
+        return self._evaluate(asset_prices, average_prices, dx=1)
+
+    def get_gammas(self, asset_prices, average_prices):
+        return self._evaluate(asset_prices, average_prices, dx=2)
+
+    def get_average_deltas(self, asset_prices, average_prices):
+        """ Derivatives of prices with respect to average price """
+        return self._evaluate(asset_prices, average_prices, dy=1)
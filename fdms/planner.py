@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+""" Choice of the cheapest grid for required accuracy """
+
+import math
+
+import numpy as np
+
+from .core import (
+    FDMBaseAsian,
+    Nodes
+)
+from .implicit_fdms import AsianOptionReducedFDM
+
+
+class GridPlanner(object):
+    """
+    Planner of domain and nodes counts for finite difference scheme.
+
+    Asset price domain is truncated at the distance from strike which
+    is found from volatility, maturity and tolerance. Error of every
+    dimension is modelled as c * h^p (p = scheme order for time, 2 for
+    asset price and average price). Constants c are calibrated by
+    Richardson extrapolation on coarse pilot solves, where the pilot
+    grid is refined in one dimension at a time. Every dimension gets an
+    equal share of the tolerance reduced by safety factor, since pilot
+    grids are usually not fine enough for the asymptotic error model.
+    Time steps of explicit schemes are also limited by stability.
+
+    Values given in asset_price_max, average_price_max and nodes_counts
+    are used as is, domains start at asset_price_min and
+    average_price_min. solver_parameters are passed to every solver, so
+    pilots run the same scheme as the planned calculation. Pilot solves
+    which diverge are rejected with ValueError instead of being used for
+    the error model.
+    """
+    # pilot diverges if its prices exceed the scale of initial and
+    # boundary values this number of times
+    divergence_factor = 10.0
+
+    def __init__(self, fdm_class, option, market, tolerance,
+                 asset_price_max=None, average_price_max=None,
+                 nodes_counts=None, safety=0.5, solver_parameters=None,
+                 asset_price_min=0.0, average_price_min=0.0):
+        if issubclass(fdm_class, AsianOptionReducedFDM):
+            raise ValueError(
+                "Grid planning is not supported for %s" % fdm_class.__name__
+            )
+        self.fdm_class = fdm_class
+        self.option = option
+        self.market = market
+        self.tolerance = tolerance
+        self.asset_price_min = asset_price_min
+        self.asset_price_max = asset_price_max
+        self.average_price_min = average_price_min
+        self.average_price_max = average_price_max
+        self.nodes_counts = dict(nodes_counts or {})
+        self.safety = safety
+        self.solver_parameters = dict(solver_parameters or {})
+
+        self.names = ['time', 'asset_price']
+        if issubclass(fdm_class, FDMBaseAsian):
+            self.names.append('average_price')
+        self.orders = dict((name, 2) for name in self.names)
+
+    def get_intervals(self):
+        """ Truncated domain for every dimension """
+        deviation = self.market.volatility * math.sqrt(self.option.maturity)
+        # probability of the asset price outside of the domain is
+        # about the tolerance relative to strike
+        quantile = max(
+            3.0,
+            math.sqrt(2.0 * math.log(
+                max(self.option.strike / self.tolerance, 1.0)
+            ))
+        )
+        asset_price_max = self.asset_price_max or (
+            self.option.strike * math.exp(
+                abs(self.market.interest) * self.option.maturity +
+                quantile * deviation
+            )
+        )
+        intervals = {
+            'time': [0.0, self.option.maturity],
+            'asset_price': [self.asset_price_min, asset_price_max]
+        }
+        if 'average_price' in self.names:
+            intervals['average_price'] = [
+                self.average_price_min,
+                self.average_price_max or
+                self.option.maturity * asset_price_max
+            ]
+        for name, (interval_min, interval_max) in intervals.items():
+            if interval_max <= interval_min:
+                raise ValueError(
+                    "Planned %s interval [%f, %f] is empty" %
+                    (name, interval_min, interval_max)
+                )
+        return intervals
+
+    def _get_pilot_counts(self, intervals):
+        """
+        Nodes counts of the base pilot grid. Steps are about a quarter of
+        the standard deviation of the asset price at maturity
+        """
+        step = (
+            self.option.strike * self.market.volatility *
+            math.sqrt(self.option.maturity) / 4.0
+        )
+        counts = {'time': 21}
+        for name in self.names[1:]:
+            scale = self.option.maturity if name == 'average_price' else 1.0
+            counts[name] = int(min(max(
+                (intervals[name][1] - intervals[name][0]) / (scale * step),
+                20
+            ), 400)) + 1
+        counts.update(self.nodes_counts)
+        return counts
+
+    def _get_stable_time_count(self, intervals, counts):
+        """ Minimum number of time nodes for stable explicit scheme """
+        fdm = self._get_fdm(intervals, dict(counts, time=2))
+        max_dt = fdm.get_max_stable_dt()
+        if np.isinf(max_dt):
+            return 2
+        return int(math.ceil(self.option.maturity / max_dt)) + 1
+
+    def _get_nodes(self, intervals, counts):
+        return Nodes([
+            (intervals[name], counts[name], name) for name in self.names
+        ])
+
+    def _get_fdm(self, intervals, counts):
+        return self.fdm_class(
+            self.option, self.market, self._get_nodes(intervals, counts),
+            **self.solver_parameters
+        )
+
+    def _solve(self, intervals, counts):
+        """ Option prices at tau = T """
+        fdm = self._get_fdm(intervals, counts)
+        max_price = None
+        for tau, layer in fdm.iter_layers():
+            if max_price is None:
+                max_price = self.divergence_factor * max(
+                    np.max(np.abs(layer)), intervals['asset_price'][1]
+                )
+            if not np.all(np.isfinite(layer)) or (
+                np.max(np.abs(layer)) > max_price
+            ):
+                raise ValueError(
+                    "Pilot solve of %s diverged at tau = %f on grid %s" %
+                    (fdm.__class__.__name__, tau, counts)
+                )
+        return layer.copy()
+
+    @staticmethod
+    def _refine(count):
+        return 2 * (count - 1) + 1
+
+    def plan(self):
+        """
+        Run pilot solves and choose nodes counts.
+        :return: Nodes for the cheapest grid that meets the tolerance
+        """
+        intervals = self.get_intervals()
+        counts = self._get_pilot_counts(intervals)
+        # order may depend on solver parameters (e.g. theta)
+        self.orders['time'] = getattr(
+            self._get_fdm(intervals, dict(counts, time=2)), 'order', 1
+        )
+
+        # time step of pilots has to be stable for all refined grids
+        refined_counts = dict(
+            (name, self._refine(count)) for name, count in counts.items()
+        )
+        counts['time'] = max(
+            counts['time'],
+            self._get_stable_time_count(intervals, refined_counts)
+        )
+        base_prices = self._solve(intervals, counts)
+
+        self.error_constants = {}
+        for axis, name in enumerate(self.names):
+            if name in self.nodes_counts:
+                continue
+            refined_prices = self._solve(
+                intervals, dict(counts, **{name: self._refine(counts[name])})
+            )
+            if name != 'time':
+                # take values in nodes of base grid
+                index = [slice(None)] * refined_prices.ndim
+                index[axis - 1] = slice(None, None, 2)
+                refined_prices = refined_prices[tuple(index)]
+
+            order = self.orders[name]
+            error = (
+                np.max(np.abs(refined_prices - base_prices)) *
+                2**order / (2**order - 1)
+            )
+            step = (
+                (intervals[name][1] - intervals[name][0]) /
+                (counts[name] - 1)
+            )
+            self.error_constants[name] = error / step**order
+
+        planned_counts = dict(self.nodes_counts)
+        free_names = [
+            name for name in self.names if name not in self.nodes_counts
+        ]
+        for name in free_names:
+            length = intervals[name][1] - intervals[name][0]
+            constant = self.error_constants[name]
+            if constant > 0:
+                step = (
+                    self.safety * self.tolerance /
+                    (len(free_names) * constant)
+                )**(1.0 / self.orders[name])
+                count = int(math.ceil(length / step)) + 1
+            else:
+                count = 0
+            planned_counts[name] = max(count, (counts[name] + 1) // 2, 3)
+
+        if 'time' not in self.nodes_counts:
+            planned_counts['time'] = max(
+                planned_counts['time'],
+                self._get_stable_time_count(intervals, planned_counts)
+            )
+
+        self.intervals = intervals
+        self.planned_counts = planned_counts
+        self.estimated_error = sum(
+            constant * (
+                (intervals[name][1] - intervals[name][0]) /
+                (planned_counts[name] - 1)
+            )**self.orders[name]
+            for name, constant in self.error_constants.items()
+        )
+        return self._get_nodes(intervals, planned_counts)
@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+""" Estimate of solver cost before the calculation """
+
+import itertools
+import os
+import sys
+import time
+
+import numpy as np
+
+from .core import FDMBaseAsianGrid
+
+# memory of one workbook cell in openpyxl and its size in xlsx file
+WORKBOOK_CELL_BYTES = 250
+FILE_CELL_BYTES = 10
+
+
+def format_bytes(value):
+    for unit in ['B', 'KB', 'MB', 'GB']:
+        if value < 1024.0:
+            return "%.1f %s" % (value, unit)
+        value /= 1024.0
+    return "%.1f TB" % value
+
+
+class PreflightEstimator(object):
+    """
+    Estimator of memory, runtime and stability of finite difference
+    solver. Memory is found from grid sizes. Runtime is extrapolated from
+    a few layers of the scheme calculated on this host, setup time (time
+    to the first step including e.g. factorizations) is counted once.
+    """
+    def __init__(self, fdm, benchmark_steps=5, export_points_number=None):
+        self.fdm = fdm
+        self.benchmark_steps = benchmark_steps
+        self.export_points_number = export_points_number
+
+    def get_export_cells_count(self):
+        if isinstance(self.fdm, FDMBaseAsianGrid):
+            return (
+                len(self.fdm.nodes.asset_price_nodes) *
+                len(self.fdm.nodes.average_price_nodes) * 5
+            )
+        return (
+            self.export_points_number or
+            len(self.fdm.nodes.asset_price_nodes)
+        ) * 4
+
+    def get_memory_estimate(self):
+        """
+        :return: dict with bytes of working arrays ('layers'), stored
+        option prices ('history'), exported workbook ('export'), xlsx file
+        ('export_file') and total memory ('total')
+        """
+        memory = dict(self.fdm.get_memory_estimate())
+        cells_count = self.get_export_cells_count()
+        memory['export'] = cells_count * WORKBOOK_CELL_BYTES
+        memory['export_file'] = cells_count * FILE_CELL_BYTES
+        memory['total'] = (
+            memory['layers'] + memory['history'] + memory['export']
+        )
+        return memory
+
+    def get_stability(self):
+        """
+        :return: tuple of stability flag, time step and maximum stable
+        time step
+        """
+        max_dt = self.fdm.get_max_stable_dt()
+        return self.fdm.dt <= max_dt, self.fdm.dt, max_dt
+
+    def get_runtime_estimate(self):
+        """
+        Estimated calculation time in seconds. Benchmark is run only on
+        the first call
+        """
+        if hasattr(self, 'runtime'):
+            return self.runtime
+        # progress messages of solvers are not a part of the report
+        stdout = sys.stdout
+        sys.stdout = open(os.devnull, 'w')
+        try:
+            self._run_benchmark()
+        finally:
+            sys.stdout.close()
+            sys.stdout = stdout
+        return self.runtime
+
+    def _run_benchmark(self):
+        steps_number = len(self.fdm.nodes.time_nodes) - 1
+
+        layers = self.fdm.iter_layers()
+        # implicit schemes factorize inside the first step, so the initial
+        # layer and the first step are counted as setup
+        setup_steps = min(1, steps_number)
+        start = time.time()
+        for _ in itertools.islice(layers, setup_steps + 1):
+            pass
+        setup_time = time.time() - start
+
+        # median is not sensitive to single slow steps (e.g. garbage
+        # collection)
+        benchmark_steps = min(self.benchmark_steps, steps_number - setup_steps)
+        step_times = []
+        for _ in range(benchmark_steps):
+            start = time.time()
+            next(layers)
+            step_times.append(time.time() - start)
+        step_time = np.median(step_times) if step_times else 0.0
+        layers.close()
+
+        self.setup_time = setup_time
+        self.step_time = step_time
+        self.runtime = setup_time + step_time * (steps_number - setup_steps)
+
+    def check_budgets(self, memory_budget=None, runtime_budget=None):
+        """
+        Compare estimates with budgets in bytes and seconds. Benchmark is
+        run only for runtime budget and only if working arrays fit in
+        memory budget.
+        :return: list of messages about exceeded budgets
+        """
+        messages = []
+        memory = self.get_memory_estimate()
+        if memory_budget is not None and memory['total'] > memory_budget:
+            messages.append(
+                "Estimated memory %s exceeds budget %s" %
+                (format_bytes(memory['total']), format_bytes(memory_budget))
+            )
+        if runtime_budget is not None and (
+            memory_budget is None or memory['layers'] <= memory_budget
+        ):
+            runtime = self.get_runtime_estimate()
+            if runtime > runtime_budget:
+                messages.append(
+                    "Estimated runtime %.1f s exceeds budget %.1f s" %
+                    (runtime, runtime_budget)
+                )
+        return messages
+
+    def print_report(self, memory_budget=None):
+        memory = self.get_memory_estimate()
+        print("Solver: %s" % self.fdm.__class__.__name__)
+        print("Grid: %s" % ' x '.join(
+            "%d %s" % (len(getattr(self.fdm.nodes, name + '_nodes')), name)
+            for name in ['time', 'asset_price', 'average_price',
+                         'reduced_variable']
+            if hasattr(self.fdm.nodes, name + '_nodes')
+        ))
+        print("Memory of working arrays: %s" % format_bytes(memory['layers']))
+        print("Memory of stored prices: %s" % format_bytes(memory['history']))
+        print("Memory of export: %s, file size: %s" % (
+            format_bytes(memory['export']),
+            format_bytes(memory['export_file'])
+        ))
+        print("Total memory: %s" % format_bytes(memory['total']))
+
+        if memory_budget is not None and memory['layers'] > memory_budget:
+            print("Runtime: benchmark skipped, working arrays exceed budget")
+        else:
+            runtime = self.get_runtime_estimate()
+            print("Runtime: %.1f s (setup %.3f s, %.2e s per layer)" % (
+                runtime, self.setup_time, self.step_time
+            ))
+
+        stable, dt, max_dt = self.get_stability()
+        if np.isinf(max_dt):
+            print("Stability: unconditionally stable")
+        elif stable:
+            print("Stability: stable, dt = %e <= %e" % (dt, max_dt))
+        else:
+            print(
+                "Stability: UNSTABLE, dt = %e > %e, at least %d time nodes "
+                "are needed" % (
+                    dt, max_dt,
+                    int(np.ceil(self.fdm.option.maturity / max_dt)) + 1
+                )
+            )
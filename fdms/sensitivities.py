@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+""" Vega and rho by bump and revalue in one batched solver pass """
+
+import copy
+
+import numpy as np
+
+from .core import FDMBaseAsianGrid
+from .explicit_fdms import (
+    AsianOptionExplicitFDM,
+    EuropianOptionExplicitFDM
+)
+from .implicit_fdms import EuropianOptionImplicitFDM
+
+
+class MarketSensitivities(object):
+    """
+    Option prices with vega and rho on the grid of the solver at tau = T.
+
+    Base market data and scenarios with volatility multiplied by
+    1 +- volatility_relative_bump and interest +- interest_bump are
+    stacked as the leading axis of market data arrays, so the solver
+    calculates all five scenarios in one time loop with coefficient
+    arrays for every scenario. Sensitivities are central differences of
+    prices over the scenarios. Volatility bump is relative, so the down
+    scenario stays positive for any volatility.
+
+    Supported solvers are explicit and implicit schemes for europian and
+    american options and explicit scheme for asian options. Implicit
+    europian scheme solves the scenarios as one block diagonal system.
+    """
+    supported_classes = (
+        EuropianOptionExplicitFDM, EuropianOptionImplicitFDM,
+        AsianOptionExplicitFDM
+    )
+
+    def __init__(self, fdm_class, option, market, nodes,
+                 volatility_relative_bump=0.01, interest_bump=0.0001):
+        if not issubclass(fdm_class, self.supported_classes):
+            raise ValueError(
+                "Batched scenarios are not supported for %s" %
+                fdm_class.__name__
+            )
+        if not 0 < volatility_relative_bump < 1:
+            raise ValueError("Relative volatility bump must be in (0, 1)")
+        if np.any(np.asarray(market.volatility) <= 0):
+            raise ValueError("Volatility must be positive")
+        self.fdm_class = fdm_class
+        self.option = option
+        self.market = market
+        self.nodes = nodes
+        self.volatility_relative_bump = volatility_relative_bump
+        self.interest_bump = interest_bump
+
+    def get_scenarios(self):
+        """
+        Market data with arrays of shape (5, 1): base, volatility up and
+        down, interest up and down
+        """
+        scenarios = copy.copy(self.market)
+        scenarios.interest = (
+            self.market.interest + self.interest_bump *
+            np.array([[0.0], [0.0], [0.0], [1.0], [-1.0]])
+        )
+        scenarios.volatility = self.market.volatility * (
+            1.0 + self.volatility_relative_bump *
+            np.array([[0.0], [1.0], [-1.0], [0.0], [0.0]])
+        )
+        return scenarios
+
+    def calculate(self):
+        """
+        Run the solver once for all scenarios.
+        :return: option prices, vega and rho at tau = T
+        """
+        fdm = self.fdm_class(self.option, self.get_scenarios(), self.nodes)
+        prices = fdm.calculate_prices()
+        if not isinstance(fdm, FDMBaseAsianGrid):
+            prices = prices[-1]
+
+        self.fdm = fdm
+        self.option_prices = prices[0]
+        self.vega = (prices[1] - prices[2]) / (
+            2.0 * self.volatility_relative_bump * self.market.volatility
+        )
+        self.rho = (prices[3] - prices[4]) / (2.0 * self.interest_bump)
+        return self.option_prices, self.vega, self.rho
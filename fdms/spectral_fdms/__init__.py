@@ -0,0 +1 @@
+from .europian_option_fdm import EuropianOptionSpectralFDM
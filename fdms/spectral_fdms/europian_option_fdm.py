@@ -0,0 +1,234 @@
+# -*- coding: utf-8 -*-
+"""
+Propagator of semi-discrete Black-Scholes PDE for europian options
+without time stepping
+"""
+
+import numpy as np
+from scipy import sparse
+from scipy.linalg import eigh_tridiagonal
+from scipy.sparse.linalg import expm_multiply
+
+from market import expm1_ratio
+from ..core import FDMBaseEuropian
+
+
+class EuropianOptionSpectralFDM(FDMBaseEuropian):
+    """
+    Exact time integration of the semi-discrete Black-Scholes PDE
+    dV/dtau = L V + boundary terms, where L is the time independent
+    tridiagonal generator of central differences in asset price.
+
+    If L is similar to a symmetric matrix (sub- and superdiagonal
+    products are positive), its eigendecomposition is cached per market
+    data and grid, and prices at any maturities are obtained by a few
+    dense products. Otherwise (sigma^2 j < r for some nodes, e.g. for
+    small volatility) eigenvectors are too ill-conditioned to be used,
+    and the action of the exponential of the sparse generator augmented
+    by boundary terms is evaluated by expm_multiply. Every maturity is
+    reached by one jump, evenly spaced maturities in one call.
+
+    Time nodes are used only as default maturities.
+    """
+
+    def _get_generator_diagonals(self):
+        """ Subdiagonal, diagonal and superdiagonal of L """
+        j_points = np.arange(1, len(self.nodes.asset_price_nodes) - 1)
+        sigma2 = self.market.volatility ** 2
+        interest = self.market.interest
+        lower = (sigma2 * j_points ** 2 - interest * j_points) / 2.0
+        diagonal = -(sigma2 * j_points ** 2 + interest)
+        upper = (sigma2 * j_points ** 2 + interest * j_points) / 2.0
+        return lower, diagonal, upper
+
+    def is_symmetrizable(self):
+        lower, _, upper = self._get_generator_diagonals()
+        return bool(np.all(lower[1:] * upper[:-1] > 0))
+
+    def get_memory_estimate(self):
+        nodes_count = len(self.nodes.asset_price_nodes)
+        time_nodes_count = len(self.nodes.time_nodes)
+        itemsize = np.dtype(float).itemsize
+        if self.is_symmetrizable():
+            # eigenvectors, their inverse and eigen coordinates of layers
+            layers = 2 * nodes_count**2 + 2 * time_nodes_count * nodes_count
+        else:
+            # sparse generator and work vectors of expm_multiply
+            layers = 10 * nodes_count
+        return {
+            'layers': layers * itemsize,
+            'history': time_nodes_count * nodes_count * itemsize
+        }
+
+    def _get_decomposition(self):
+        return self._get_cached(
+            'europian_spectral',
+            self._calculate_decomposition,
+            len(self.nodes.asset_price_nodes)
+        )
+
+    def _calculate_decomposition(self):
+        """
+        Eigenvalues, eigenvectors and inverse eigenvectors of L.
+        L = D T D^-1 with diagonal D and symmetric T, so eigenvectors of
+        L are D Q and inverse is Q^T D^-1 where T = Q diag Q^T
+        """
+        lower, diagonal, upper = self._get_generator_diagonals()
+        ratios = lower[1:] / upper[:-1]
+        eigenvalues, Q = eigh_tridiagonal(
+            diagonal, np.sqrt(lower[1:] * upper[:-1])
+        )
+        # scaling is accumulated in logarithms to avoid overflow
+        log_scales = np.concatenate(([0.0], np.cumsum(np.log(ratios) / 2.0)))
+        log_scales -= log_scales.max()
+        scales = np.exp(log_scales)
+        return (
+            eigenvalues,
+            scales[:, np.newaxis] * Q,
+            Q.T / scales[np.newaxis, :]
+        )
+
+    def _get_boundary_forcing(self):
+        """ Vector multiplied by the right boundary value in dV/dtau """
+        _, _, upper = self._get_generator_diagonals()
+        forcing = np.zeros(len(upper))
+        forcing[-1] = upper[-1]
+        return forcing
+
+    def _propagate_spectral(self, initial, maturities):
+        """
+        Inner values at maturities. The right boundary value is
+        S_max - K exp(-r tau), so Duhamel integral is known in closed form
+        for every eigenvalue
+        """
+        eigenvalues, vectors, inverse_vectors = self._get_decomposition()
+        initial_coordinates = inverse_vectors.dot(initial)
+        forcing_coordinates = inverse_vectors.dot(self._get_boundary_forcing())
+
+        tau = maturities[:, np.newaxis]
+        # int_0^tau exp(lambda * (tau - s)) * b(s) ds
+        constant_integral = tau * expm1_ratio(eigenvalues * tau)
+        discount_integral = (
+            np.exp(-self.market.interest * tau) * tau *
+            expm1_ratio((eigenvalues + self.market.interest) * tau)
+        )
+        coordinates = (
+            np.exp(eigenvalues * tau) * initial_coordinates +
+            forcing_coordinates * (
+                self.nodes.asset_price_nodes[-1] * constant_integral -
+                self.option.strike * discount_integral
+            )
+        )
+        return coordinates.dot(vectors.T)
+
+    def _get_augmented_generator(self):
+        """ Generator of state (V, S_max, -K exp(-r tau)) in CSR format """
+        lower, diagonal, upper = self._get_generator_diagonals()
+        forcing = sparse.csr_matrix(
+            self._get_boundary_forcing()[:, np.newaxis]
+        )
+        return sparse.bmat([
+            [sparse.diags([lower[1:], diagonal, upper[:-1]], [-1, 0, 1]),
+             forcing, forcing],
+            [None, sparse.csr_matrix((1, 1)), None],
+            [None, None, sparse.csr_matrix([[-self.market.interest]])]
+        ], format='csr')
+
+    def _get_initial_state(self, initial):
+        return np.concatenate(
+            (initial, [self.nodes.asset_price_nodes[-1], -self.option.strike])
+        )
+
+    def _iter_augmented(self, initial, maturities):
+        """
+        Inner values at maturities from the action of the exponential of
+        the augmented generator. Every maturity is reached by one jump
+        from the previous one when it is not smaller, from tau = 0
+        otherwise
+        """
+        generator = self._get_augmented_generator()
+        initial_state = self._get_initial_state(initial)
+        state = initial_state
+        tau = 0.0
+        for maturity in maturities:
+            if maturity < tau:
+                state = initial_state
+                tau = 0.0
+            if maturity > tau:
+                state = expm_multiply(generator * (maturity - tau), state)
+                tau = maturity
+            yield state[:len(initial)]
+
+    def _propagate_augmented(self, initial, maturities):
+        """
+        Inner values at all maturities. Evenly spaced increasing
+        maturities are evaluated by one call of expm_multiply
+        """
+        steps = np.diff(maturities)
+        if len(maturities) > 2 and np.all(steps > 0) and np.allclose(
+            steps, steps[0], rtol=1e-9, atol=0.0
+        ):
+            return expm_multiply(
+                self._get_augmented_generator(),
+                self._get_initial_state(initial),
+                start=maturities[0], stop=maturities[-1],
+                num=len(maturities), endpoint=True
+            )[:, :len(initial)]
+        return np.array(list(self._iter_augmented(initial, maturities)))
+
+    def _get_initial_values(self):
+        return self.option.calculate_payoff(
+            self.nodes.asset_price_nodes[1:-1]
+        )
+
+    def _fill_layers(self, C, maturities, inner_values):
+        C[..., 0] = self.get_boundary_left(maturities)
+        C[..., -1] = self.get_boundary_right(maturities)
+        C[..., 1:-1] = inner_values
+
+    def iter_layers(self, maturities=None):
+        """
+        Generator of (tau, layer) for every time to maturity in
+        maturities (time nodes by default)
+        """
+        if maturities is None:
+            maturities = self.nodes.time_nodes
+        maturities = np.asarray(maturities, dtype=float)
+
+        initial = self._get_initial_values()
+        if self.is_symmetrizable():
+            inner_values = (
+                self._propagate_spectral(initial, maturities[[index]])[0]
+                for index in range(len(maturities))
+            )
+        else:
+            inner_values = self._iter_augmented(initial, maturities)
+
+        layer = np.empty(len(self.nodes.asset_price_nodes))
+        for tau, values in zip(maturities, inner_values):
+            self._fill_layers(layer, tau, values)
+            yield tau, layer
+
+    def calculate_prices(self, maturities=None):
+        """
+        Option prices for every time to maturity in maturities (time
+        nodes by default) in the given order. All maturities are
+        propagated at once. Prices at tau = T are used by interpolator,
+        comparison and export, so maturities have to include T for them
+        """
+        if maturities is None:
+            maturities = self.nodes.time_nodes
+        maturities = np.asarray(maturities, dtype=float)
+
+        if self.is_symmetrizable():
+            propagate = self._propagate_spectral
+        else:
+            propagate = self._propagate_augmented
+        C = np.empty((len(maturities), len(self.nodes.asset_price_nodes)))
+        self._fill_layers(
+            C, maturities, propagate(self._get_initial_values(), maturities)
+        )
+
+        self.maturities = maturities
+        self.option_prices = C
+        return self.option_prices
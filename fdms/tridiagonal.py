@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+""" Thomas algorithm for tridiagonal systems of linear equations """
+
+import numpy as np
+from scipy import sparse
+from scipy.sparse.linalg import splu
+
+
+def factorize_tridiagonal(alpha, beta, gamma):
+    """
+    Pivots of forward elimination for tridiagonal matrix with
+    subdiagonal alpha, diagonal beta and superdiagonal gamma
+    (alpha[0] and gamma[-1] are not used). Leading axes of arguments
+    are independent systems
+    """
+    alpha, beta, gamma = _to_last_axis_first(alpha, beta, gamma)
+    y = np.zeros(beta.shape)
+    y[0] = beta[0]
+    for i in range(0, len(y) - 1):
+        y[i + 1] = beta[i + 1] - alpha[i + 1] * gamma[i] / y[i]
+    return np.moveaxis(y, 0, -1)
+
+
+def solve_tridiagonal(alpha, gamma, y, rhs, lower_bound=None):
+    """
+    Solve tridiagonal system with pivots y computed by
+    factorize_tridiagonal.
+
+    If lower_bound is given, solution is projected on it during back
+    substitution (Brennan-Schwartz algorithm). The result is the solution
+    of linear complementarity problem when the region where the bound is
+    active is adjacent to the last unknown.
+    """
+    alpha, gamma, y, rhs = _to_last_axis_first(alpha, gamma, y, rhs)
+    q = np.zeros(rhs.shape)
+    q[0] = rhs[0]
+    for i in range(1, len(q)):
+        q[i] = rhs[i] - alpha[i] / y[i - 1] * q[i - 1]
+
+    x = np.zeros(rhs.shape)
+    x[-1] = q[-1] / y[-1]
+    if lower_bound is None:
+        for i in range(len(x) - 2, -1, -1):
+            x[i] = (q[i] - gamma[i] * x[i + 1]) / y[i]
+    else:
+        lower_bound, = _to_last_axis_first(lower_bound)
+        # built-in max is faster for scalars of one system
+        maximum = max if x.ndim == 1 else np.maximum
+        x[-1] = maximum(x[-1], lower_bound[-1])
+        for i in range(len(x) - 2, -1, -1):
+            x[i] = maximum(
+                (q[i] - gamma[i] * x[i + 1]) / y[i], lower_bound[i]
+            )
+    return np.moveaxis(x, 0, -1)
+
+
+def factorize_batched_tridiagonal(alpha, beta, gamma):
+    """
+    Sparse LU factorization of the independent tridiagonal systems on
+    leading axes of arguments stacked into one block diagonal system
+    (couplings between blocks are zero). Solve a stack of right hand
+    sides rhs by solve(rhs.ravel()).reshape(rhs.shape), so rows of all
+    systems are eliminated in compiled code instead of a Python loop
+    """
+    alpha, beta, gamma = np.broadcast_arrays(alpha, beta, gamma)
+    lower = alpha.copy()
+    lower[..., 0] = 0.0
+    upper = gamma.copy()
+    upper[..., -1] = 0.0
+    return splu(sparse.diags(
+        [lower.ravel()[1:], beta.ravel(), upper.ravel()[:-1]], [-1, 0, 1],
+        format='csc'
+    ))
+
+
+def _to_last_axis_first(*arrays):
+    """
+    Broadcast arrays and move unknowns axis first, so loops index rows
+    of all systems at once (or scalars for one system)
+    """
+    return [
+        np.moveaxis(array, -1, 0) for array in np.broadcast_arrays(*arrays)
+    ]
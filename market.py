@@ -4,6 +4,7 @@
 import math
 
 import numpy as np
+from scipy.special import ndtr
 
 
 class MarketData(object):
@@ -46,6 +47,48 @@ class EuropianOption(Option):
         )
         return option_price
 
+    def calculate_chain_prices(self, asset_price, strikes, market_data,
+                               terms_number=256, truncation=10.0):
+        """
+        Prices of options with the same maturity and any strikes by COS
+        method of Fang and Oosterlee. Density of log(S_T / K) is expanded
+        in cosine series on the interval of truncation * standard
+        deviation around its mean. The interval has the same width for
+        all strikes, so the characteristic function is evaluated once and
+        the whole chain is priced in one vectorized sum. Call prices are
+        obtained from put-call parity, which keeps deep in the money
+        calls accurate.
+        """
+        strikes = np.asarray(strikes, dtype=float)
+        interest = market_data.interest
+        deviation = market_data.volatility * np.sqrt(self.maturity)
+        mean = (interest - market_data.volatility**2 / 2.0) * self.maturity
+        width = 2.0 * truncation * deviation
+
+        u = np.arange(terms_number) * np.pi / width
+        # characteristic function of log(S_T / K) shifted by lower bound
+        # of the interval, which doesn't depend on strike
+        characteristic_function = np.exp(
+            1j * u * truncation * deviation - deviation**2 * u**2 / 2.0
+        )
+        characteristic_function[0] /= 2.0
+
+        # put payoff K * (1 - exp(y)) is positive for y < 0
+        a = (np.log(asset_price / strikes) + mean - truncation * deviation)
+        a = a[..., np.newaxis]
+        d = np.minimum(a + width, 0.0)
+        payoff_coefficients = np.where(
+            a < 0,
+            2.0 / width * (_cos_psi(u, a, a, d) - _cos_chi(u, a, a, d)),
+            0.0
+        )
+
+        discounted_strikes = strikes * np.exp(-interest * self.maturity)
+        puts = discounted_strikes * np.sum(
+            np.real(characteristic_function) * payoff_coefficients, axis=-1
+        )
+        return puts + asset_price - discounted_strikes
+
     def _cdf(self, x):
         """
         Calculate cumulative distribution function in a certain point
@@ -59,11 +102,371 @@ class EuropianOption(Option):
             )
 
 
+class AmericanOption(EuropianOption):
+    """ American call or put option """
+
+    def __init__(self, strike, maturity, option_type='call', *args,
+                 **kwargs):
+        super(AmericanOption, self).__init__(
+            strike, maturity, *args, **kwargs
+        )
+        if option_type not in ['call', 'put']:
+            raise ValueError("Option type must be either call or put")
+        self.option_type = option_type
+
+    def calculate_payoff(self, asset_price):
+        if self.option_type == 'put':
+            return np.maximum(self.strike - asset_price, 0)
+        return np.maximum(asset_price - self.strike, 0)
+
+    def calculate_price(self, asset_price, market_data):
+        """
+        Early exercise of call is never optimal without dividends, so its
+        price is equal to europian one
+        """
+        if self.option_type == 'put':
+            raise NotImplementedError(
+                "There is no closed form solution for american put"
+            )
+        return super(AmericanOption, self).calculate_price(
+            asset_price, market_data
+        )
+
+
 class AsianOption(Option):
+    """
+    Arithmetic average fixed strike asian option. Average price is the
+    integral of the asset price over elapsed time, so the payoff is
+    max(A / T - K, 0).
+
+    Analytical pricers broadcast over arrays of asset prices, average
+    prices, elapsed times and market data parameters.
+    """
 
     def calculate_payoff(self, average_price):
         return np.maximum(average_price / self.maturity - self.strike, 0)
 
+    def calculate_geometric_price(self, asset_price, average_price,
+                                  market_data, elapsed_time=0.0):
+        """
+        Exact price of the option with geometric averaging over the
+        remaining time (already accumulated average price stays
+        arithmetic)
+        """
+        asset_price = np.asarray(asset_price, dtype=float)
+        tau = self.maturity - np.asarray(elapsed_time, dtype=float)
+        volatility = market_data.volatility
+        forward = asset_price * np.exp(
+            (market_data.interest - volatility**2 / 2.0) * tau / 2.0 +
+            volatility**2 * tau / 6.0
+        )
+        return self._calculate_lognormal_price(
+            average_price, market_data, tau, forward, volatility**2 * tau / 3.0
+        )
+
+    def calculate_levy_price(self, asset_price, average_price, market_data,
+                             elapsed_time=0.0):
+        """
+        Levy approximation: continuous arithmetic average over the
+        remaining time is replaced by lognormal variable with the same
+        first two moments
+        """
+        asset_price = np.asarray(asset_price, dtype=float)
+        tau = self.maturity - np.asarray(elapsed_time, dtype=float)
+        interest = np.asarray(market_data.interest, dtype=float)
+        volatility = market_data.volatility
+        # moments are not used for expired options
+        safe_tau = np.where(tau > 0, tau, 1.0)
+
+        first_moment = asset_price * expm1_ratio(interest * safe_tau)
+        second_moment = (
+            2.0 * asset_price**2 /
+            ((interest + volatility**2) * safe_tau) *
+            (expm1_ratio((2.0 * interest + volatility**2) * safe_tau) -
+             expm1_ratio(interest * safe_tau))
+        )
+        return self._calculate_lognormal_price(
+            average_price, market_data, tau, first_moment,
+            np.log(second_moment / first_moment**2)
+        )
+
+    def calculate_turnbull_wakeman_price(self, asset_price, average_price,
+                                         market_data, elapsed_time=0.0,
+                                         fixings_number=250):
+        """
+        Turnbull-Wakeman approximation: exact moments of the discrete
+        average of fixings_number equally spaced fixings over the
+        remaining time are matched by lognormal variable
+        """
+        asset_price = np.asarray(asset_price, dtype=float)
+        tau = self.maturity - np.asarray(elapsed_time, dtype=float)
+        interest = market_data.interest
+        volatility = market_data.volatility
+        dt = tau / fixings_number
+        growth = np.exp(interest * dt)
+        square_growth = np.exp((2.0 * interest + volatility**2) * dt)
+
+        mean = asset_price
+        square_mean = asset_price**2
+        # sum of E[S_i S_j] over i <= j for current fixing j
+        covariance_sum = 0.0
+        first_moment = 0.0
+        second_moment = 0.0
+        for _ in range(fixings_number):
+            mean = mean * growth
+            square_mean = square_mean * square_growth
+            covariance_sum = covariance_sum * growth + square_mean
+            first_moment = first_moment + mean
+            second_moment = second_moment + 2.0 * covariance_sum - square_mean
+
+        first_moment = first_moment / fixings_number
+        second_moment = second_moment / fixings_number**2
+        return self._calculate_lognormal_price(
+            average_price, market_data, tau, first_moment,
+            np.log(second_moment / first_moment**2)
+        )
+
+    def _calculate_lognormal_price(self, average_price, market_data, tau,
+                                   forward, variance):
+        """
+        Price of the option when the average over the remaining time tau
+        is lognormal with given forward and variance of its logarithm.
+        Options with tau <= 0 are worth their intrinsic value
+        """
+        average_price = np.asarray(average_price, dtype=float)
+        tau = np.asarray(tau, dtype=float)
+        expired = tau <= 0
+        weight = tau / self.maturity
+        fixed_part = average_price / self.maturity - self.strike
+        in_the_money = fixed_part >= 0
+        # strike for the average over the remaining time
+        strike = np.where(
+            in_the_money | expired, 1.0,
+            -fixed_part / np.where(expired, 1.0, weight)
+        )
+        price = np.where(
+            in_the_money,
+            fixed_part + weight * forward,
+            weight * _calculate_black_price(
+                forward, strike, np.where(expired, 1.0, variance)
+            )
+        )
+        return np.exp(-market_data.interest * np.maximum(tau, 0)) * np.where(
+            expired, np.maximum(fixed_part, 0), price
+        )
+
+
+class OptionBook(object):
+    """
+    Columnar container for many options. Every field is NumPy array with
+    one value per contract, so payoffs and prices of the whole book are
+    calculated by vectorized operations instead of per-object calls.
+
+    style and option_type are stored as indices in STYLES and
+    OPTION_TYPES. As in AsianOption, average_price is the integral of the
+    asset price over elapsed_time; asian options are calls only.
+    """
+    STYLES = ('europian', 'american', 'asian')
+    OPTION_TYPES = ('call', 'put')
+    COLUMNS = (
+        'strike', 'maturity', 'style', 'option_type', 'asset_price',
+        'average_price', 'elapsed_time', 'interest', 'volatility'
+    )
+    __slots__ = COLUMNS
+
+    def __init__(self, strike, maturity, style='europian',
+                 option_type='call', asset_price=np.nan, average_price=0.0,
+                 elapsed_time=0.0, interest=0.0, volatility=0.0):
+        columns = np.broadcast_arrays(
+            np.asarray(strike, dtype=float),
+            np.asarray(maturity, dtype=float),
+            self._get_codes(style, self.STYLES),
+            self._get_codes(option_type, self.OPTION_TYPES),
+            np.asarray(asset_price, dtype=float),
+            np.asarray(average_price, dtype=float),
+            np.asarray(elapsed_time, dtype=float),
+            np.asarray(interest, dtype=float),
+            np.asarray(volatility, dtype=float)
+        )
+        for name, column in zip(self.COLUMNS, columns):
+            setattr(self, name, np.atleast_1d(column))
+
+        if np.any(
+            (self.style == self.STYLES.index('asian')) &
+            (self.option_type == self.OPTION_TYPES.index('put'))
+        ):
+            raise ValueError("Asian options must be calls")
+
+    @staticmethod
+    def _get_codes(values, names):
+        """ Indices of names in values, integer values are kept as is """
+        values = np.asarray(values)
+        if values.dtype.kind not in 'USO':
+            return values
+        codes = np.full(values.shape, -1, dtype=np.int8)
+        for code, name in enumerate(names):
+            codes[values == name] = code
+        if np.any(codes < 0):
+            raise ValueError("Values must be one of %s" % ', '.join(names))
+        return codes
+
+    @classmethod
+    def _from_structured(cls, data):
+        return cls(**dict(
+            (name, data[name]) for name in data.dtype.names
+            if name in cls.COLUMNS
+        ))
+
+    @classmethod
+    def from_csv(cls, filename):
+        """
+        Load book from CSV file with header. Columns are named as
+        attributes, missing columns get default values
+        """
+        return cls._from_structured(np.atleast_1d(np.genfromtxt(
+            filename, delimiter=',', names=True, dtype=None,
+            encoding='utf-8'
+        )))
+
+    @classmethod
+    def from_npy(cls, filename, mmap_mode='r'):
+        """
+        Load book saved by save_npy. Columns are views of memory-mapped
+        file, so the book doesn't have to fit in memory
+        """
+        return cls._from_structured(np.load(filename, mmap_mode=mmap_mode))
+
+    def save_npy(self, filename):
+        data = np.empty(len(self), dtype=[
+            (name, getattr(self, name).dtype) for name in self.COLUMNS
+        ])
+        for name in self.COLUMNS:
+            data[name] = getattr(self, name)
+        np.save(filename, data)
+
+    def __len__(self):
+        return len(self.strike)
+
+    def take(self, indices):
+        """ Book with contracts at given indices """
+        return OptionBook(**dict(
+            (name, getattr(self, name)[indices]) for name in self.COLUMNS
+        ))
+
+    def iter_groups(self):
+        """
+        Partition of the book by maturity and market data, so every group
+        can be priced by one solver run or strike chain call.
+        :return: generator of (maturity, market data, indices)
+        """
+        keys = np.stack(
+            (self.maturity, self.interest, self.volatility), axis=-1
+        )
+        _, inverse = np.unique(keys, axis=0, return_inverse=True)
+        inverse = inverse.ravel()
+        order = np.argsort(inverse, kind='mergesort')
+        bounds = np.flatnonzero(np.diff(inverse[order])) + 1
+        for indices in np.split(order, bounds):
+            first = indices[0]
+            yield (
+                self.maturity[first],
+                MarketData(self.interest[first], self.volatility[first]),
+                indices
+            )
+
+    def calculate_payoff(self, asset_price=None, average_price=None):
+        """ Payoffs for given or stored asset prices and average prices """
+        if asset_price is None:
+            asset_price = self.asset_price
+        if average_price is None:
+            average_price = self.average_price
+        underlying = np.where(
+            self.style == self.STYLES.index('asian'),
+            average_price / self.maturity, asset_price
+        )
+        sign = np.where(
+            self.option_type == self.OPTION_TYPES.index('put'), -1.0, 1.0
+        )
+        return np.maximum(sign * (underlying - self.strike), 0)
+
+    def calculate_price(self):
+        """
+        Prices for stored asset prices and market data. Europian options
+        and american calls are priced by Black-Scholes formula, asian
+        options by Levy approximation, all over the time left after
+        elapsed_time. There is no closed form for american puts, their
+        prices are NaN
+        """
+        prices = np.full(len(self), np.nan)
+        is_put = self.option_type == self.OPTION_TYPES.index('put')
+        is_asian = self.style == self.STYLES.index('asian')
+        is_vanilla = ~is_asian & ~(
+            is_put & (self.style == self.STYLES.index('american'))
+        )
+
+        vanilla = self.take(is_vanilla)
+        tau = np.maximum(vanilla.maturity - vanilla.elapsed_time, 0)
+        discount = np.exp(-vanilla.interest * tau)
+        calls = discount * _calculate_black_price(
+            vanilla.asset_price / discount, vanilla.strike,
+            vanilla.volatility**2 * tau
+        )
+        prices[is_vanilla] = np.where(
+            is_put[is_vanilla],
+            calls - vanilla.asset_price + vanilla.strike * discount, calls
+        )
+
+        asian = self.take(is_asian)
+        prices[is_asian] = AsianOption(
+            asian.strike, asian.maturity
+        ).calculate_levy_price(
+            asian.asset_price, asian.average_price,
+            MarketData(asian.interest, asian.volatility), asian.elapsed_time
+        )
+        return prices
+
+
+def expm1_ratio(x):
+    """ (exp(x) - 1) / x which is equal to 1 for x = 0 """
+    x = np.asarray(x, dtype=float)
+    safe_x = np.where(x != 0, x, 1.0)
+    return np.where(x != 0, np.expm1(x) / safe_x, 1.0)
+
+
+def _cos_chi(u, a, c, d):
+    """ Cosine coefficients of exp(y) on [c, d] for COS method """
+    return (
+        np.cos(u * (d - a)) * np.exp(d) - np.cos(u * (c - a)) * np.exp(c) +
+        u * (np.sin(u * (d - a)) * np.exp(d) - np.sin(u * (c - a)) * np.exp(c))
+    ) / (1.0 + u**2)
+
+
+def _cos_psi(u, a, c, d):
+    """ Cosine coefficients of 1 on [c, d] for COS method """
+    safe_u = np.where(u != 0, u, 1.0)
+    return np.where(
+        u != 0,
+        (np.sin(u * (d - a)) - np.sin(u * (c - a))) / safe_u,
+        d - c
+    )
+
+
+def _calculate_black_price(forward, strike, variance):
+    """
+    Undiscounted Black price of call option on lognormal forward, the
+    intrinsic value of the forward for zero variance
+    """
+    variance = np.asarray(variance, dtype=float)
+    has_variance = variance > 0
+    deviation = np.sqrt(np.where(has_variance, variance, 1.0))
+    d1 = (np.log(forward / strike) + deviation**2 / 2.0) / deviation
+    d2 = d1 - deviation
+    return np.where(
+        has_variance,
+        forward * ndtr(d1) - strike * ndtr(d2),
+        np.maximum(forward - strike, 0)
+    )
+
 
 if __name__ == "__main__":
     # test
@@ -77,3 +480,239 @@ if __name__ == "__main__":
     price = EuropianOption(K, T).calculate_price(S, market)
 
     assert abs(price - 10.4506) < 10**(-4)
+
+    # strike chain by COS method against closed form
+    strikes = np.linspace(50.0, 200.0, 301)
+    chain_prices = EuropianOption(K, T).calculate_chain_prices(
+        S, strikes, market
+    )
+    analytical_prices = np.array([
+        EuropianOption(strike, T).calculate_price(S, market)
+        for strike in strikes
+    ])
+    assert np.max(np.abs(chain_prices - analytical_prices)) < 10**(-8)
+
+    # and against implicit finite difference scheme
+    from fdms.core import Nodes
+    from fdms.implicit_fdms import EuropianOptionImplicitFDM
+    fdm_strikes = np.array([80.0, 100.0, 120.0])
+    fdm_prices = []
+    for strike in fdm_strikes:
+        fdm = EuropianOptionImplicitFDM(
+            EuropianOption(strike, T), market, Nodes([
+                ([0.0, T], 1001, 'time'),
+                ([0.0, 400.0], 801, 'asset_price')
+            ])
+        )
+        fdm.calculate_prices()
+        fdm_prices.append(fdm.get_price_interpolator().get_prices(S))
+    assert np.max(np.abs(
+        EuropianOption(K, T).calculate_chain_prices(S, fdm_strikes, market) -
+        np.array(fdm_prices)
+    )) < 10**(-2)
+
+    # continuous arithmetic asian option, reference value 5.763
+    asian_option = AsianOption(K, T)
+    assert abs(
+        asian_option.calculate_levy_price(S, 0.0, market) - 5.763
+    ) < 0.05
+    assert abs(
+        asian_option.calculate_turnbull_wakeman_price(S, 0.0, market) - 5.763
+    ) < 0.05
+    assert (
+        asian_option.calculate_geometric_price(S, 0.0, market) <
+        asian_option.calculate_levy_price(S, 0.0, market)
+    )
+
+    # expiring asian options are worth their intrinsic value
+    for average_price in [90.0, 110.0]:
+        for pricer in [asian_option.calculate_levy_price,
+                       asian_option.calculate_turnbull_wakeman_price,
+                       asian_option.calculate_geometric_price]:
+            assert abs(
+                pricer(S, average_price, market, elapsed_time=T) -
+                max(average_price / T - K, 0)
+            ) < 10**(-12)
+
+    # option book against per-contract pricers
+    book = OptionBook(
+        strike=[90.0, 100.0, 110.0, 100.0, 100.0, 100.0],
+        maturity=[T, T, 0.5, T, T, T],
+        style=['europian', 'europian', 'europian', 'american', 'american',
+               'asian'],
+        option_type=['call', 'put', 'call', 'call', 'put', 'call'],
+        asset_price=S, interest=r, volatility=sigma
+    )
+    book_prices = book.calculate_price()
+    assert abs(
+        book_prices[0] - EuropianOption(90.0, T).calculate_price(S, market)
+    ) < 10**(-8)
+    assert abs(
+        book_prices[1] - (price - S + K * np.exp(-r * T))
+    ) < 10**(-8)
+    assert abs(book_prices[3] - price) < 10**(-8)
+    assert np.isnan(book_prices[4])
+    assert abs(
+        book_prices[5] - asian_option.calculate_levy_price(S, 0.0, market)
+    ) < 10**(-8)
+    assert np.allclose(book.calculate_payoff(), [10.0, 0, 0, 0, 0, 0])
+    assert len(list(book.iter_groups())) == 2
+
+    # deterministic asset price without volatility, vanilla options
+    # expire after elapsed_time as asian ones
+    book = OptionBook(
+        strike=[90.0, 110.0, K, K], maturity=T, option_type='call',
+        asset_price=S, elapsed_time=[0.0, 0.0, T / 2.0, T], interest=r,
+        volatility=[0.0, 0.0, sigma, sigma]
+    )
+    assert np.allclose(book.calculate_price(), [
+        S - 90.0 * np.exp(-r * T), 0.0,
+        EuropianOption(K, T / 2.0).calculate_price(S, market), 0.0
+    ])
+
+    # Monte Carlo pricer of the same asian option
+    from monte_carlo import AsianOptionMonteCarlo
+    monte_carlo = AsianOptionMonteCarlo(
+        asian_option, market, target_error=0.01, seed=1
+    )
+    monte_carlo_price = monte_carlo.calculate_prices(S, 0.0)
+    assert abs(monte_carlo_price - 5.763) < 0.02
+    assert monte_carlo.standard_errors <= 0.01
+    assert monte_carlo.calculate_prices(S, 0.0) == monte_carlo_price
+
+    # one-dimensional reduced PDE
+    from fdms.implicit_fdms import AsianOptionReducedFDM
+    reduced_fdm = AsianOptionReducedFDM(asian_option, market, Nodes([
+        ([0.0, T], 201, 'time'),
+        ([0.0, 200.0], 11, 'asset_price'),
+        ([0.0, 100.0], 11, 'average_price'),
+        ([-1.0, 1.0], 401, 'reduced_variable')
+    ]))
+    reduced_fdm.calculate_prices()
+    assert abs(reduced_fdm.get_prices(S, 0.0) - 5.763) < 0.02
+
+    # american put is not less than payoff and europian put, reference
+    # value 6.090
+    from fdms.implicit_fdms import AmericanOptionImplicitFDM
+    american_fdm = AmericanOptionImplicitFDM(
+        AmericanOption(K, T, 'put'), market, Nodes([
+            ([0.0, T], 501, 'time'),
+            ([0.0, 400.0], 801, 'asset_price')
+        ])
+    )
+    american_fdm.calculate_prices()
+    assert np.all(american_fdm.option_prices >= american_fdm._payoff)
+    american_price = american_fdm.get_price_interpolator().get_prices(S)
+    assert abs(american_price - 6.090) < 0.01
+    assert american_price > price - S + K * np.exp(-r * T)
+
+    # adaptive time stepping of implicit scheme
+    from fdms.adaptive import AdaptiveTimeStepper
+    stepper = AdaptiveTimeStepper(
+        EuropianOptionImplicitFDM(EuropianOption(K, T), market, Nodes([
+            ([0.0, T], 2, 'time'),
+            ([0.0, 400.0], 401, 'asset_price')
+        ])),
+        tolerance=10**(-3)
+    )
+    stepper.calculate_prices()
+    assert abs(stepper.time_nodes[-1] - T) < 10**(-12)
+    assert abs(
+        stepper.fdm.get_price_interpolator().get_prices(S) - price
+    ) < 10**(-2)
+
+    # resumed explicit asian solve is identical to uninterrupted one
+    import os
+    import shutil
+    import tempfile
+    from fdms.explicit_fdms import AsianOptionExplicitFDM
+    asian_fdm = AsianOptionExplicitFDM(asian_option, market, Nodes([
+        ([0.0, T], 501, 'time'),
+        ([0.0, 300.0], 31, 'asset_price'),
+        ([0.0, 300.0], 31, 'average_price')
+    ]))
+    asian_prices = asian_fdm.calculate_prices().copy()
+    checkpoint_directory = tempfile.mkdtemp()
+    try:
+        checkpoint_path = os.path.join(checkpoint_directory, 'asian.npz')
+        layers = asian_fdm.iter_layers(
+            checkpoint_path=checkpoint_path, checkpoint_steps=100
+        )
+        for tau, layer in layers:
+            if tau > T / 2.0:
+                break
+        layers.close()
+        for tau, layer in asian_fdm.iter_layers(
+            checkpoint_path=checkpoint_path, resume=True
+        ):
+            pass
+    finally:
+        shutil.rmtree(checkpoint_directory)
+    assert np.array_equal(layer, asian_prices)
+
+    # planned grid of explicit asian scheme is stable and its pilots
+    # converge
+    from fdms.planner import GridPlanner
+    planned_nodes = GridPlanner(
+        AsianOptionExplicitFDM, asian_option, market, tolerance=0.5
+    ).plan()
+    planned_fdm = AsianOptionExplicitFDM(asian_option, market, planned_nodes)
+    assert planned_fdm.dt <= planned_fdm.get_max_stable_dt()
+
+    # spectral solver with symmetrizable generator and without it
+    # (small volatility), prices at tau = T are found for any order of
+    # maturities
+    from fdms.spectral_fdms import EuropianOptionSpectralFDM
+    for volatility in [sigma, 0.01]:
+        spectral_market = MarketData(r, volatility)
+        spectral_fdm = EuropianOptionSpectralFDM(
+            EuropianOption(K, T), spectral_market, Nodes([
+                ([0.0, T], 11, 'time'),
+                ([0.0, 400.0], 801, 'asset_price')
+            ])
+        )
+        spectral_fdm.calculate_prices([T, T / 2.0])
+        assert abs(
+            spectral_fdm.get_price_interpolator().get_prices(S) -
+            EuropianOption(K, T).calculate_price(S, spectral_market)
+        ) < 10**(-2)
+
+    # Crank-Nicolson scheme on sparse operator with direct and
+    # iterative solver against explicit scheme on the same grid
+    from fdms.implicit_fdms import AsianOptionImplicitFDM
+    theta_nodes = Nodes([
+        ([0.0, T], 51, 'time'),
+        ([0.0, 300.0], 31, 'asset_price'),
+        ([0.0, 300.0], 31, 'average_price')
+    ])
+    lu_prices = AsianOptionImplicitFDM(
+        asian_option, market, theta_nodes, theta=0.5
+    ).calculate_prices()
+    bicgstab_prices = AsianOptionImplicitFDM(
+        asian_option, market, theta_nodes, theta=0.5,
+        linear_solver='bicgstab'
+    ).calculate_prices()
+    assert np.max(np.abs(lu_prices - bicgstab_prices)) < 10**(-5)
+    assert abs(lu_prices[10, 0] - asian_prices[10, 0]) < 0.1
+
+    # batched scenarios give the same prices as serial solve and
+    # sensitivities close to Black-Scholes vega and rho
+    from fdms.sensitivities import MarketSensitivities
+    sensitivities_nodes = Nodes([
+        ([0.0, T], 201, 'time'),
+        ([0.0, 400.0], 401, 'asset_price')
+    ])
+    batched_prices, vega, rho = MarketSensitivities(
+        EuropianOptionImplicitFDM, EuropianOption(K, T), market,
+        sensitivities_nodes
+    ).calculate()
+    serial_prices = EuropianOptionImplicitFDM(
+        EuropianOption(K, T), market, sensitivities_nodes
+    ).calculate_prices()[-1]
+    assert np.max(np.abs(batched_prices - serial_prices)) < 10**(-10)
+    d1 = (np.log(S / K) + (r + sigma**2 / 2.0) * T) / (sigma * np.sqrt(T))
+    assert abs(vega[100] - S * np.sqrt(T / (2.0 * np.pi)) *
+               np.exp(-d1**2 / 2.0)) < 0.1
+    assert abs(
+        rho[100] - K * T * np.exp(-r * T) * ndtr(d1 - sigma * np.sqrt(T))
+    ) < 0.1
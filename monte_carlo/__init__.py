@@ -0,0 +1 @@
+from .asian_option_mc import AsianOptionMonteCarlo
@@ -0,0 +1,268 @@
+# -*- coding: utf-8 -*-
+""" Monte Carlo engine for arithmetic asian options """
+
+import time
+import multiprocessing
+
+import numpy as np
+from scipy.special import ndtr
+
+
+def _simulate_chunk(task):
+    """
+    Simulate one chunk of GBM paths started at S = 1 and return sums
+    needed for the control variate estimator.
+
+    Every path is paired with its antithetic counterpart, so one sample
+    is the mean payoff of the pair. Since paths are scaled by the initial
+    asset price, the same chunk prices all requested (S, A) points.
+    """
+    (
+        seed, pairs_number, steps_number, tau, interest, volatility,
+        asset_prices, fixed_parts, weight
+    ) = task
+    generator = np.random.RandomState(seed)
+    dt = tau / steps_number
+
+    drift = (interest - volatility**2 / 2.0) * dt
+    shocks = (
+        volatility * np.sqrt(dt) *
+        generator.standard_normal((pairs_number, steps_number))
+    )
+
+    samples = []
+    for sign in [1.0, -1.0]:
+        # antithetic path mirrors the shocks of every increment
+        log_paths = np.zeros((pairs_number, steps_number + 1))
+        np.cumsum(
+            drift + sign * shocks, axis=1,
+            out=log_paths[:, 1:]
+        )
+        # trapezoidal rule for continuous averaging
+        arithmetic = (
+            np.exp(log_paths[:, 1:-1]).sum(axis=1) +
+            (1.0 + np.exp(log_paths[:, -1])) / 2.0
+        ) / steps_number
+        geometric = np.exp(
+            (log_paths[:, 1:-1].sum(axis=1) + log_paths[:, -1] / 2.0) /
+            steps_number
+        )
+        samples.append((
+            np.maximum(
+                fixed_parts[:, np.newaxis] +
+                weight * asset_prices[:, np.newaxis] * arithmetic, 0
+            ),
+            np.maximum(
+                fixed_parts[:, np.newaxis] +
+                weight * asset_prices[:, np.newaxis] * geometric, 0
+            )
+        ))
+
+    Y = (samples[0][0] + samples[1][0]) / 2.0
+    X = (samples[0][1] + samples[1][1]) / 2.0
+    return (
+        pairs_number,
+        Y.sum(axis=1), X.sum(axis=1),
+        (Y * Y).sum(axis=1), (X * X).sum(axis=1), (X * Y).sum(axis=1)
+    )
+
+
+class AsianOptionMonteCarlo(object):
+    """
+    Monte Carlo pricer for arithmetic asian option with antithetic
+    variates and geometric average control variate.
+
+    Prices are defined in the same way as in AsianOptionExplicitFDM:
+    average_price is the accumulated integral of the asset price and
+    tau is the time left to maturity, so results at tau = maturity are
+    directly comparable with the last layer of the finite difference
+    solution.
+    """
+
+    def __init__(self, option, market, steps_number=250, chunk_size=10000,
+                 target_error=1e-3, max_paths_number=10**7, processes=1,
+                 seed=None):
+        self.option = option
+        self.market = market
+        self.steps_number = steps_number
+        self.chunk_size = chunk_size
+        self.target_error = target_error
+        self.max_paths_number = max_paths_number
+        self.processes = processes
+        self.seed = seed
+
+    def _get_geometric_moments(self, tau):
+        """
+        Mean and variance of the logarithm of discrete geometric average
+        of the path started at S = 1
+        """
+        dt = tau / self.steps_number
+        weights = np.ones(self.steps_number + 1) / self.steps_number
+        weights[0] = weights[-1] = 0.5 / self.steps_number
+        # sum_ij w_i w_j min(t_i, t_j) = sum_k dt * (sum_{i >= k} w_i)^2
+        tail_weights = np.cumsum(weights[::-1])[::-1][1:]
+        mean = (
+            (self.market.interest - self.market.volatility**2 / 2.0) *
+            tau / 2.0
+        )
+        variance = (
+            self.market.volatility**2 * dt * np.sum(tail_weights**2)
+        )
+        return mean, variance
+
+    def get_control_expectation(self, asset_prices, fixed_parts, tau):
+        """
+        Exact undiscounted expectation of the control variate
+        max(fixed_part + tau / T * S * G, 0)
+        """
+        mean, variance = self._get_geometric_moments(tau)
+        scale = tau / self.option.maturity * asset_prices
+        forward = scale * np.exp(mean + variance / 2.0)
+
+        in_the_money = fixed_parts >= 0
+        safe_scale = np.where(scale > 0, scale, 1.0)
+        strike = np.where(in_the_money, 1.0, -fixed_parts / safe_scale)
+        d1 = (
+            (mean + variance - np.log(strike)) / np.sqrt(variance)
+        )
+        d2 = d1 - np.sqrt(variance)
+        otm_price = forward * ndtr(d1) - scale * strike * ndtr(d2)
+
+        return np.where(
+            scale > 0,
+            np.where(in_the_money, fixed_parts + forward, otm_price),
+            np.maximum(fixed_parts, 0)
+        )
+
+    def _get_task(self, seed, asset_prices, fixed_parts, tau):
+        return (
+            seed, self.chunk_size // 2, self.steps_number, tau,
+            self.market.interest, self.market.volatility,
+            asset_prices, fixed_parts, tau / self.option.maturity
+        )
+
+    def calculate_prices(self, asset_prices, average_prices, tau=None):
+        """
+        Calculate option prices for arrays of asset prices and average
+        prices. Simulation goes on chunk by chunk until the standard error
+        of every price is below target_error or max_paths_number paths
+        were simulated.
+        """
+        if tau is None:
+            tau = self.option.maturity
+        asset_prices, average_prices = np.broadcast_arrays(
+            np.asarray(asset_prices, dtype=float),
+            np.asarray(average_prices, dtype=float)
+        )
+        shape = asset_prices.shape
+        asset_prices = asset_prices.ravel()
+        fixed_parts = (
+            average_prices.ravel() / self.option.maturity -
+            self.option.strike
+        )
+        control_expectation = self.get_control_expectation(
+            asset_prices, fixed_parts, tau
+        )
+
+        discount = np.exp(-self.market.interest * tau)
+        sums = np.zeros((5, len(asset_prices)))
+        pairs_number = 0
+        # every chunk gets its own stream seeded by (seed, chunk number),
+        # so results don't depend on the number of processes
+        seed = self.seed
+        if seed is None:
+            seed = np.random.RandomState().randint(2**31 - 1)
+        chunks_number = 0
+        pool = (
+            multiprocessing.Pool(self.processes)
+            if self.processes > 1 else None
+        )
+
+        start = time.time()
+        try:
+            finished = False
+            while not finished:
+                tasks = [
+                    self._get_task(
+                        [seed, chunks_number + index],
+                        asset_prices, fixed_parts, tau
+                    )
+                    for index in range(max(self.processes, 1))
+                ]
+                chunks_number += len(tasks)
+                if pool is not None:
+                    results = pool.map(_simulate_chunk, tasks)
+                else:
+                    results = [_simulate_chunk(task) for task in tasks]
+
+                for result in results:
+                    pairs_number += result[0]
+                    sums += np.array(result[1:])
+                    prices, errors = self._get_estimate(
+                        sums, pairs_number, control_expectation
+                    )
+                    finished = (
+                        discount * np.max(errors) <= self.target_error or
+                        2 * pairs_number >= self.max_paths_number
+                    )
+                    if finished:
+                        break
+        finally:
+            if pool is not None:
+                pool.terminate()
+
+        self.paths_number = 2 * pairs_number
+        self.calculation_time = time.time() - start
+        self.standard_errors = (discount * errors).reshape(shape)
+        self.option_prices = (discount * prices).reshape(shape)
+
+        return self.option_prices
+
+    @staticmethod
+    def _get_estimate(sums, pairs_number, control_expectation):
+        """ Control variate estimate and its standard error """
+        sum_Y, sum_X, sum_YY, sum_XX, sum_XY = sums
+        mean_Y = sum_Y / pairs_number
+        mean_X = sum_X / pairs_number
+        var_Y = np.maximum(sum_YY / pairs_number - mean_Y**2, 0)
+        var_X = np.maximum(sum_XX / pairs_number - mean_X**2, 0)
+        cov_XY = sum_XY / pairs_number - mean_X * mean_Y
+
+        safe_var_X = np.where(var_X > 0, var_X, 1.0)
+        beta = np.where(var_X > 0, cov_XY / safe_var_X, 0.0)
+        prices = mean_Y - beta * (mean_X - control_expectation)
+        residual_var = np.maximum(
+            var_Y - 2 * beta * cov_XY + beta**2 * var_X, 0
+        )
+        return prices, np.sqrt(residual_var / max(pairs_number - 1, 1))
+
+    def compare_with_fdm(self, fdm, asset_price_indices,
+                         average_price_indices):
+        """
+        Compare Monte Carlo prices with finite difference solution at
+        chosen (S, A) nodes
+        """
+        fdm._check_prices_calculated()
+        asset_price_indices, average_price_indices = np.broadcast_arrays(
+            asset_price_indices, average_price_indices
+        )
+        prices_numerical = fdm.option_prices[
+            asset_price_indices, average_price_indices
+        ]
+        prices_monte_carlo = self.calculate_prices(
+            fdm.nodes.asset_price_nodes[asset_price_indices],
+            fdm.nodes.average_price_nodes[average_price_indices]
+        )
+
+        differences = np.abs(prices_monte_carlo - prices_numerical)
+        max_error_index = np.argmax(differences)
+
+        print("Max difference: %f" % differences.flat[max_error_index])
+        print("Monte Carlo price: %f +- %f" % (
+            prices_monte_carlo.flat[max_error_index],
+            self.standard_errors.flat[max_error_index]
+        ))
+        print("Numerical price: %f" % prices_numerical.flat[max_error_index])
+        print("Paths simulated: %d" % self.paths_number)
+
+        return differences